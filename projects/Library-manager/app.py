@@ -1,28 +1,81 @@
-import json
+import argparse
+import sys
+
+from bulk import export_books, import_books, read_books
+from storage import JsonStorage, SqliteStorage, migrate_json_to_sqlite
+
+
+SORT_CHOICES = {"2": "title", "3": "author", "4": "year", "5": "genre", "6": "read"}
+
+
+def format_book(index, book):
+    """Return the numbered one-line description of a book used in listings."""
+    reading_status = "Read" if book["read"] else "Unread"
+    return f"{index}. {book['title']} by {book['author']} ({book['year']}) - {book['genre']} - {reading_status}"
 
 
 class BookCollection:
     """A class to manage a collection of books, allowing users to store and organize their reading materials."""
 
-    def __init__(self):
-        """Initialize a new book collection with an empty list and set up file storage."""
-        self.book_list = []
-        self.storage_file = "books_data.json"
-        self.read_from_file()
+    def __init__(self, storage_file="books_data.json", use_journal=True, compact_every=1000, storage=None, lazy=False):
+        """Initialize a new book collection and set up file storage.
+
+        Books live in a storage backend (see ``storage.py``). By default that is the
+        JSON file ``storage_file``, parsed up front unless ``lazy`` is set; pass
+        ``storage`` to use another backend such as ``SqliteStorage``."""
+        self.storage_file = storage_file
+        if storage is None:
+            storage = JsonStorage(storage_file, use_journal, compact_every, lazy)
+        self.storage = storage
+
+    @property
+    def book_list(self):
+        """All books in the collection, in insertion order."""
+        return list(self.storage.iter_books())
 
     def read_from_file(self):
-        """Load saved books from a JSON file into memory.
-        If the file doesn't exist or is corrupted, start with an empty collection."""
-        try:
-            with open(self.storage_file, "r") as file:
-                self.book_list = json.load(file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.book_list = []
+        """Reload the collection from permanent storage."""
+        self.storage.load()
 
     def save_to_file(self):
-        """Store the current book collection to a JSON file for permanent storage."""
-        with open(self.storage_file, "w") as file:
-            json.dump(self.book_list, file, indent=4)
+        """Store the current book collection for permanent storage."""
+        self.storage.save()
+
+    def books_by_author(self, author):
+        """Return all books written by the given author (case-insensitive)."""
+        return self.storage.books_by_author(author)
+
+    def get_book(self, title):
+        """Return the first book with the given title (case-insensitive), or None."""
+        return self.storage.get(title)
+
+    def add_book(self, book):
+        """Add a book record to the collection and persist the change."""
+        self.storage.add(book)
+
+    def remove_book(self, title):
+        """Remove the first book with the given title. Returns False if there is none."""
+        return self.storage.delete(title)
+
+    def edit_book(self, title, changes):
+        """Apply a dict of field changes to the first book with the given title.
+        Returns False if there is no such book."""
+        return self.storage.update(title, changes)
+
+    def import_from_file(self, path, file_format=None, batch_size=10000):
+        """Bulk-add books from a CSV or JSON Lines file, skipping titles already present.
+        Returns ``(imported, skipped)``."""
+        return import_books(self.storage, read_books(path, file_format), batch_size)
+
+    def export_to_file(self, path, file_format=None):
+        """Write every book to a CSV or JSON Lines file. Returns the number written."""
+        return export_books(self.storage, path, file_format)
+
+    def reading_stats(self):
+        """Return reading-progress statistics without scanning the collection:
+        ``{"total", "read", "genres", "authors", "years"}``, where each group maps a
+        value to its ``{"total", "read"}`` counts."""
+        return self.storage.stats()
 
     def create_new_book(self):
         """Add a new book to the collection by gathering information from the user."""
@@ -42,82 +95,98 @@ class BookCollection:
             "read": is_book_read,
         }
 
-        self.book_list.append(new_book)
-        self.save_to_file()
+        self.add_book(new_book)
         print("Book added successfully!\n")
 
     def delete_book(self):
         """Remove a book from the collection using its title."""
         book_title = input("Enter the title of the book to remove: ")
 
-        for book in self.book_list:
-            if book["title"].lower() == book_title.lower():
-                self.book_list.remove(book)
-                self.save_to_file()
-                print("Book removed successfully!\n")
-                return
-        print("Book not found!\n")
+        if self.remove_book(book_title):
+            print("Book removed successfully!\n")
+        else:
+            print("Book not found!\n")
 
     def find_book(self):
         """Search for books in the collection by title or author name."""
         search_type = input("Search by:\n1. Title\n2. Author\nEnter your choice: ")
-        search_text = input("Enter search term: ").lower()
-        found_books = [
-            book
-            for book in self.book_list
-            if search_text in book["title"].lower()
-            or search_text in book["author"].lower()
-        ]
+        search_text = input("Enter search term: ")
+        if search_type == "1":
+            search_fields = ("title",)
+        elif search_type == "2":
+            search_fields = ("author",)
+        else:
+            search_fields = ("title", "author")
+        found_books = self.storage.search(search_text, search_fields)
 
         if found_books:
             print("Matching Books:")
             for index, book in enumerate(found_books, 1):
-                reading_status = "Read" if book["read"] else "Unread"
-                print(
-                    f"{index}. {book['title']} by {book['author']} ({book['year']}) - {book['genre']} - {reading_status}"
-                )
+                print(format_book(index, book))
         else:
             print("No matching books found.\n")
 
     def update_book(self):
         """Modify the details of an existing book in the collection."""
         book_title = input("Enter the title of the book you want to edit: ")
-        for book in self.book_list:
-            if book["title"].lower() == book_title.lower():
-                print("Leave blank to keep existing value.")
-                book["title"] = input(f"New title ({book['title']}): ") or book["title"]
-                book["author"] = (
-                    input(f"New author ({book['author']}): ") or book["author"]
-                )
-                book["year"] = input(f"New year ({book['year']}): ") or book["year"]
-                book["genre"] = input(f"New genre ({book['genre']}): ") or book["genre"]
-                book["read"] = (
-                    input("Have you read this book? (yes/no): ").strip().lower()
-                    == "yes"
-                )
-                self.save_to_file()
-                print("Book updated successfully!\n")
-                return
-        print("Book not found!\n")
-
-    def show_all_books(self):
-        """Display all books in the collection with their details."""
-        if not self.book_list:
-            print("Your collection is empty.\n")
+        book = self.get_book(book_title)
+        if book is None:
+            print("Book not found!\n")
             return
 
-        print("Your Book Collection:")
-        for index, book in enumerate(self.book_list, 1):
-            reading_status = "Read" if book["read"] else "Unread"
-            print(
-                f"{index}. {book['title']} by {book['author']} ({book['year']}) - {book['genre']} - {reading_status}"
+        print("Leave blank to keep existing value.")
+        changes = {
+            "title": input(f"New title ({book['title']}): ") or book["title"],
+            "author": input(f"New author ({book['author']}): ") or book["author"],
+            "year": input(f"New year ({book['year']}): ") or book["year"],
+            "genre": input(f"New genre ({book['genre']}): ") or book["genre"],
+            "read": input("Have you read this book? (yes/no): ").strip().lower()
+            == "yes",
+        }
+        self.edit_book(book_title, changes)
+        print("Book updated successfully!\n")
+
+    def show_all_books(self, page_size=20):
+        """Display the books in the collection a page at a time, in the order the user picks.
+        Pages come from the storage's pre-sorted indexes and each is written in one go."""
+        sort_choice = input(
+            "Sort by:\n1. Date added\n2. Title\n3. Author\n4. Year\n5. Genre\n6. Read status\n"
+            "Enter your choice: "
+        ).strip()
+        sort_by = SORT_CHOICES.get(sort_choice)
+
+        page = 0
+        while True:
+            offset = page * page_size
+            books = self.storage.list_books(sort_by, offset=offset, limit=page_size + 1)
+            has_next_page = len(books) > page_size
+            if not books and page == 0:
+                print("Your collection is empty.\n")
+                return
+
+            lines = [f"Your Book Collection (page {page + 1}):"]
+            lines.extend(
+                format_book(index, book)
+                for index, book in enumerate(books[:page_size], offset + 1)
             )
-        print()
+            sys.stdout.write("\n".join(lines) + "\n\n")
+
+            if page == 0 and not has_next_page:
+                return
+            navigation = input(
+                "n = next page, p = previous page, Enter = back to menu: "
+            ).strip().lower()
+            if navigation == "n" and has_next_page:
+                page += 1
+            elif navigation == "p" and page > 0:
+                page -= 1
+            elif navigation not in ("n", "p"):
+                print()
+                return
 
     def show_reading_progress(self):
         """Calculate and display statistics about your reading progress."""
-        total_books = len(self.book_list)
-        completed_books = sum(1 for book in self.book_list if book["read"])
+        total_books, completed_books = self.storage.progress()
         completion_rate = (
             (completed_books / total_books * 100) if total_books > 0 else 0
         )
@@ -157,6 +226,42 @@ class BookCollection:
                 print("Invalid choice. Please try again.\n")
 
 
+def main():
+    """Command-line entry point: run the interactive manager or a maintenance command."""
+    parser = argparse.ArgumentParser(description="Book Collection Manager")
+    parser.add_argument("--db", help="use this SQLite database instead of books_data.json")
+    subparsers = parser.add_subparsers(dest="command")
+
+    migrate_parser = subparsers.add_parser("migrate", help="copy a JSON catalog into a SQLite database")
+    migrate_parser.add_argument("json_file")
+    migrate_parser.add_argument("database_file")
+
+    import_parser = subparsers.add_parser("import", help="bulk-add books from a CSV or JSON Lines file")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"])
+    import_parser.add_argument("--batch-size", type=int, default=10000)
+
+    export_parser = subparsers.add_parser("export", help="write every book to a CSV or JSON Lines file")
+    export_parser.add_argument("file")
+    export_parser.add_argument("--format", choices=["csv", "jsonl"])
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        migrated = migrate_json_to_sqlite(args.json_file, args.database_file)
+        print(f"Migrated {migrated} books into {args.database_file}.")
+        return
+
+    storage = SqliteStorage(args.db) if args.db else None
+    book_manager = BookCollection(storage=storage, lazy=True)
+    if args.command == "import":
+        imported, skipped = book_manager.import_from_file(args.file, args.format, args.batch_size)
+        print(f"Imported {imported} books, skipped {skipped} duplicate titles.")
+    elif args.command == "export":
+        exported = book_manager.export_to_file(args.file, args.format)
+        print(f"Exported {exported} books to {args.file}.")
+    else:
+        book_manager.start_application()
+
+
 if __name__ == "__main__":
-    book_manager = BookCollection()
-    book_manager.start_application()
+    main()
@@ -0,0 +1,172 @@
+"""Benchmarks for the Book Collection Manager.
+
+Run from this directory, e.g.:
+
+    python bench.py journal --sizes 10000 100000 1000000
+    python bench.py loader --sizes 100000 1000000
+    python bench.py memory --sizes 1000000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from app import BookCollection
+from storage import Book
+
+
+def make_books(count):
+    """Generate ``count`` synthetic book records."""
+    genres = ["fiction", "history", "science", "poetry", "kahani", "biography"]
+    return [
+        {
+            "title": f"Book {index}",
+            "author": f"Author {index % 5000}",
+            "year": str(1900 + index % 125),
+            "genre": genres[index % len(genres)],
+            "read": index % 3 == 0,
+        }
+        for index in range(count)
+    ]
+
+
+def write_catalog(path, books):
+    """Write a catalog file in the same format the app uses."""
+    with open(path, "w") as file:
+        json.dump(books, file, indent=4)
+
+
+def time_mutations(collection, mutations):
+    """Run alternating add/update/delete mutations and return seconds per mutation."""
+    start = time.perf_counter()
+    for index in range(mutations):
+        title = f"Bench {index}"
+        collection.add_book(
+            {"title": title, "author": "Bench", "year": "2025", "genre": "bench", "read": False}
+        )
+        collection.edit_book(title, {"read": True})
+        collection.remove_book(title)
+    return (time.perf_counter() - start) / (mutations * 3)
+
+
+def bench_journal(sizes, mutations):
+    """Compare per-mutation latency of journal appends against full rewrites."""
+    print(f"{'books':>10} {'rewrite ms/op':>15} {'journal ms/op':>15} {'speedup':>10}")
+    for size in sizes:
+        books = make_books(size)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "books_data.json")
+
+            write_catalog(path, books)
+            rewrite = BookCollection(path, use_journal=False)
+            # Full rewrites get slow quickly, so only a handful are timed at large sizes.
+            rewrite_latency = time_mutations(rewrite, max(1, min(mutations, 100000 // size)))
+
+            write_catalog(path, books)
+            journal = BookCollection(path, use_journal=True, compact_every=10**9)
+            journal_latency = time_mutations(journal, mutations)
+
+        print(
+            f"{size:>10} {rewrite_latency * 1000:>15.3f} {journal_latency * 1000:>15.3f}"
+            f" {rewrite_latency / journal_latency:>9.0f}x"
+        )
+
+
+# Each loader runs in a fresh interpreter so its peak RSS isn't polluted by the others.
+LOADER_SCRIPT = """
+import json, resource, sys, time
+from storage import JsonStorage, iter_books_from_file
+
+path, mode = sys.argv[1], sys.argv[2]
+start = time.perf_counter()
+if mode == "json.load":
+    with open(path) as file:
+        books = json.load(file)
+    first = books[0]
+elif mode == "JsonStorage":
+    first = next(JsonStorage(path).iter_books())
+elif mode == "stream first":
+    first = next(iter_books_from_file(path))
+elif mode == "stream all":
+    first = None
+    for book in iter_books_from_file(path):
+        if first is None:
+            first = book
+elif mode == "stream read":
+    read = sum(1 for book in iter_books_from_file(path, ("read",)) if book["read"])
+first_output = time.perf_counter() - start
+print(first_output, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def bench_loader(sizes):
+    """Compare peak RSS and time-to-first-book of the whole-file and streaming loaders.
+    The "stream all" and "stream read" rows time a full pass instead."""
+    modes = ["json.load", "JsonStorage", "stream first", "stream all", "stream read"]
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"{'books':>10} {'loader':>14} {'seconds':>10} {'peak RSS MB':>12}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "books_data.json")
+            write_catalog(path, make_books(size))
+            for mode in modes:
+                output = subprocess.run(
+                    [sys.executable, "-c", LOADER_SCRIPT, path, mode],
+                    cwd=here, capture_output=True, text=True, check=True,
+                ).stdout
+                seconds, max_rss_kb = output.split()
+                print(f"{size:>10} {mode:>14} {float(seconds):>10.3f} {int(max_rss_kb) / 1024:>12.1f}")
+
+
+def bench_memory(sizes):
+    """Compare the memory held by dict records and by compact Book records."""
+    print(f"{'books':>10} {'dicts MB':>10} {'Books MB':>10} {'saving':>8}")
+    for size in sizes:
+        # Decode from JSON text so strings aren't shared the way make_books shares them.
+        text = json.dumps(make_books(size))
+
+        tracemalloc.start()
+        dict_books = json.loads(text)
+        dict_memory = tracemalloc.get_traced_memory()[0]
+        compact_books = [Book.from_dict(book) for book in dict_books]
+        del dict_books
+        book_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del compact_books
+
+        print(
+            f"{size:>10} {dict_memory / 2**20:>10.1f} {book_memory / 2**20:>10.1f}"
+            f" {1 - book_memory / dict_memory:>7.0%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Book Collection Manager benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    journal_parser = subparsers.add_parser("journal", help="journal vs full rewrite per mutation")
+    journal_parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    journal_parser.add_argument("--mutations", type=int, default=200)
+
+    loader_parser = subparsers.add_parser("loader", help="whole-file vs streaming catalog loading")
+    loader_parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+
+    memory_parser = subparsers.add_parser("memory", help="dict vs compact Book record memory")
+    memory_parser.add_argument("--sizes", type=int, nargs="+", default=[1000000])
+
+    args = parser.parse_args()
+    if args.benchmark == "journal":
+        bench_journal(args.sizes, args.mutations)
+    elif args.benchmark == "loader":
+        bench_loader(args.sizes)
+    elif args.benchmark == "memory":
+        bench_memory(args.sizes)
+
+
+if __name__ == "__main__":
+    main()
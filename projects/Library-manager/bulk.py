@@ -0,0 +1,100 @@
+import csv
+import itertools
+import json
+import os
+
+from storage import Book
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+def detect_format(path, file_format=None):
+    """Return ``file_format`` or, if it isn't given, guess it from the file extension."""
+    if file_format:
+        return file_format
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Can't tell the format of {path}; use .csv or .jsonl")
+    return FORMATS[extension]
+
+
+def parse_read_flag(value):
+    """Interpret a read flag written as a bool or as yes/no, true/false, 1/0."""
+    if isinstance(value, str):
+        return value.strip().lower() in ("yes", "y", "true", "1")
+    return bool(value)
+
+
+def normalize_book(record):
+    """Turn an imported record into a book dict with all five fields."""
+    if not record.get("title"):
+        raise ValueError(f"Book record without a title: {record}")
+    return {
+        "title": record["title"],
+        "author": record.get("author") or "",
+        "year": str(record.get("year") or ""),
+        "genre": record.get("genre") or "",
+        "read": parse_read_flag(record.get("read", False)),
+    }
+
+
+def read_books(path, file_format=None):
+    """Yield the book records of a CSV (with a header row) or JSON Lines file."""
+    file_format = detect_format(path, file_format)
+    with open(path, "r", newline="", encoding="utf-8") as file:
+        if file_format == "csv":
+            records = csv.DictReader(file)
+        else:
+            records = (json.loads(line) for line in file if line.strip())
+        for record in records:
+            yield normalize_book(record)
+
+
+def import_books(storage, books, batch_size=10000):
+    """Add books to a storage backend in batches and persist once at the end.
+
+    Books whose title (case-insensitive) is already in the collection, or appeared
+    earlier in the import, are skipped. Returns ``(imported, skipped)``."""
+    seen_titles = set()
+    imported = skipped = 0
+
+    def is_new(book):
+        nonlocal skipped
+        title_key = book["title"].casefold()
+        if title_key in seen_titles or storage.get(book["title"]) is not None:
+            skipped += 1
+            return False
+        seen_titles.add(title_key)
+        return True
+
+    new_books = filter(is_new, books)
+    with storage.batch():
+        while True:
+            batch = list(itertools.islice(new_books, batch_size))
+            if not batch:
+                break
+            storage.add_many(batch)
+            imported += len(batch)
+        storage.save()
+    return imported, skipped
+
+
+def export_books(storage, path, file_format=None):
+    """Stream every book of a storage backend to a CSV or JSON Lines file.
+    Returns the number of books written."""
+    file_format = detect_format(path, file_format)
+    exported = 0
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        if file_format == "csv":
+            writer = csv.DictWriter(file, fieldnames=Book.FIELDS)
+            writer.writeheader()
+        for book in storage.iter_books():
+            record = {field: book[field] for field in Book.FIELDS}
+            record["year"] = str(record["year"])
+            if file_format == "csv":
+                record["read"] = "yes" if record["read"] else "no"
+                writer.writerow(record)
+            else:
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            exported += 1
+    return exported
@@ -0,0 +1,1132 @@
+import bisect
+import contextlib
+import itertools
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+SEARCH_FIELDS = ("title", "author")
+SORT_FIELDS = ("title", "author", "year", "genre", "read")
+
+
+def sort_key(book, field):
+    """Key a book sorts by for a listing field: titles and authors ignore case,
+    years compare as numbers, with years that aren't plain numbers after them."""
+    value = book[field]
+    if field in SEARCH_FIELDS:
+        return value.casefold()
+    if field == "year":
+        if isinstance(value, int):
+            return (0, value, str(value))
+        if value.isascii() and value.isdigit():
+            return (0, int(value), value)
+        return (1, 0, value)
+    return value
+
+
+def trigrams(text):
+    """Return the set of three-character substrings of ``text``."""
+    return {text[index : index + 3] for index in range(len(text) - 2)}
+
+
+class Book:
+    """Compact in-memory record of one book.
+
+    A slotted object is several times smaller than the dict it is loaded from.
+    Authors and genres repeat across many books, so they are interned to share one
+    string each, and canonical numeric years are kept as ints. Books still read like
+    the dicts stored in the JSON file (``book["title"]``, ``dict(book)``) and
+    ``to_dict`` gives back exactly that file format."""
+
+    __slots__ = ("title", "author", "year", "genre", "read")
+    FIELDS = __slots__
+
+    def __init__(self, title, author, year, genre, read):
+        self.title = title
+        self.author = sys.intern(author)
+        self.year = self._compact_year(year)
+        self.genre = sys.intern(genre)
+        self.read = bool(read)
+
+    @classmethod
+    def from_dict(cls, book):
+        """Build a Book from a dict record as stored in the JSON file."""
+        return cls(book["title"], book["author"], book["year"], book["genre"], book["read"])
+
+    def to_dict(self):
+        """Return the dict record written to the JSON file."""
+        return {
+            "title": self.title,
+            "author": self.author,
+            "year": str(self.year),
+            "genre": self.genre,
+            "read": self.read,
+        }
+
+    def update(self, changes):
+        """Apply a dict of field changes."""
+        for field, value in changes.items():
+            if field == "author" or field == "genre":
+                value = sys.intern(value)
+            elif field == "year":
+                value = self._compact_year(value)
+            elif field == "read":
+                value = bool(value)
+            setattr(self, field, value)
+
+    def keys(self):
+        return self.FIELDS
+
+    def __getitem__(self, field):
+        if field not in self.FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __eq__(self, other):
+        if isinstance(other, Book):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __repr__(self):
+        return f"Book({self.title!r}, {self.author!r}, {self.year!r}, {self.genre!r}, {self.read!r})"
+
+    @staticmethod
+    def _compact_year(year):
+        """Store a year as an int when that round-trips to the same string."""
+        if isinstance(year, str) and year.isdigit() and str(int(year)) == year:
+            return int(year)
+        return year
+
+
+def iter_books_from_file(storage_file, fields=None, chunk_size=1 << 16):
+    """Yield the books of a JSON catalog one by one without parsing the whole file.
+
+    The file is read in chunks and each array element is decoded as soon as it is
+    complete, so the first book is available right away and memory stays bounded
+    by the largest record. With ``fields`` given, only those keys are kept. A
+    missing file yields nothing; a corrupted one stops at the first bad record."""
+    decoder = json.JSONDecoder()
+    try:
+        file = open(storage_file, "r")
+    except FileNotFoundError:
+        return
+    with file:
+        buffer = ""
+        position = 0
+        at_end = False
+        started = False
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position < len(buffer):
+                if not started:
+                    if buffer[position] != "[":
+                        return
+                    started = True
+                    position += 1
+                    continue
+                if buffer[position] == "]":
+                    return
+                try:
+                    book, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if at_end:
+                        return
+                else:
+                    if fields is not None:
+                        book = {field: book[field] for field in fields}
+                    yield book
+                    continue
+            elif at_end:
+                return
+
+            chunk = file.read(chunk_size)
+            at_end = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+
+
+def write_books(file, books):
+    """Write books to an open file in the same layout as ``json.dump(..., indent=4)``,
+    one record at a time so no full list of dicts is built."""
+    separator = "[\n"
+    for book in books:
+        record = json.dumps(book.to_dict() if isinstance(book, Book) else book, indent=4)
+        file.write(separator + "    " + record.replace("\n", "\n    "))
+        separator = ",\n"
+    file.write("[]" if separator == "[\n" else "\n]")
+
+
+STATS_GROUPS = {"genres": "genre", "authors": "author", "years": "year"}
+
+
+class ReadingStats:
+    """Running reading-progress counters, adjusted one book at a time.
+
+    Keeps the total and read counts for the whole collection and per genre, author
+    and year, so asking for statistics never has to look at the books themselves."""
+
+    def __init__(self):
+        self.total = 0
+        self.read = 0
+        self.groups = {group: {} for group in STATS_GROUPS}
+
+    def tally(self, book, delta):
+        """Count a book in (``delta=1``) or out (``delta=-1``) of the statistics."""
+        read = delta if book["read"] else 0
+        self.total += delta
+        self.read += read
+        for group, field in STATS_GROUPS.items():
+            counters = self.groups[group]
+            key = str(book[field])
+            counts = counters.get(key)
+            if counts is None:
+                counts = counters[key] = [0, 0]
+            counts[0] += delta
+            counts[1] += read
+            if counts[0] == 0:
+                del counters[key]
+
+    def as_dict(self):
+        """Return the counters as ``{"total", "read", "genres", "authors", "years"}``,
+        where each group maps a value to its ``{"total", "read"}`` counts."""
+        stats = {"total": self.total, "read": self.read}
+        for group, counters in self.groups.items():
+            stats[group] = {
+                key: {"total": total, "read": read}
+                for key, (total, read) in counters.items()
+            }
+        return stats
+
+
+def file_signature(path):
+    """Return ``(inode, mtime, size)`` of a file, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+@contextlib.contextmanager
+def file_lock(lock_file):
+    """Hold an exclusive lock on ``lock_file``, shared by every process using it."""
+    with open(lock_file, "a+b") as file:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        else:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class BookStorage:
+    """Interface every storage backend of BookCollection implements.
+
+    Books are records with ``title``, ``author``, ``year``, ``genre`` and ``read``
+    keys (dicts, or Book objects that read like them). Titles are matched case-insensitively, and when several books share a title
+    the oldest one wins."""
+
+    def load(self):
+        """(Re)load the collection from permanent storage."""
+        raise NotImplementedError
+
+    def save(self):
+        """Flush everything to permanent storage."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the backend."""
+
+    def get(self, title):
+        """Return the first book with the given title, or None."""
+        raise NotImplementedError
+
+    def add(self, book):
+        """Add a book record."""
+        raise NotImplementedError
+
+    def add_many(self, books):
+        """Add many book records without persisting them; call ``save`` afterwards."""
+        raise NotImplementedError
+
+    def batch(self):
+        """Context manager grouping several calls (e.g. ``add_many`` then ``save``)
+        so no other writer can interleave."""
+        return contextlib.nullcontext()
+
+    def update(self, title, changes):
+        """Apply field changes to the first book with the given title. Returns False if there is none."""
+        raise NotImplementedError
+
+    def delete(self, title):
+        """Remove the first book with the given title. Returns False if there is none."""
+        raise NotImplementedError
+
+    def search(self, text, fields=SEARCH_FIELDS):
+        """Return the books whose given fields contain ``text`` (case-insensitive)."""
+        raise NotImplementedError
+
+    def books_by_author(self, author):
+        """Return all books written by the given author (case-insensitive)."""
+        raise NotImplementedError
+
+    def iter_books(self, fields=None):
+        """Yield every book in insertion order, optionally keeping only the given fields."""
+        raise NotImplementedError
+
+    def list_books(self, sort_by=None, descending=False, offset=0, limit=None):
+        """Return one page of books, in insertion order or sorted by a ``SORT_FIELDS``
+        field (ties keep insertion order)."""
+        raise NotImplementedError
+
+    def count(self):
+        """Return the number of books in the collection."""
+        raise NotImplementedError
+
+    def count_read(self):
+        """Return the number of books marked as read."""
+        raise NotImplementedError
+
+    def progress(self):
+        """Return ``(number of books, number read)`` in one call."""
+        return self.count(), self.count_read()
+
+    def stats(self):
+        """Return reading-progress statistics in the format of ``ReadingStats.as_dict``."""
+        raise NotImplementedError
+
+
+class JsonStorage(BookStorage):
+    """Keep the whole collection in memory, persisted to a JSON file.
+
+    Books are kept in a dict keyed by an internal id so removal doesn't have to scan.
+    The title index maps a case-folded title to the ids sharing it (oldest first), and
+    the author index maps a case-folded author to the set of its ids. Substring
+    search goes through a trigram index per searchable field, so a query only checks
+    the books holding every trigram of the search text.
+
+    With ``use_journal`` enabled, every change is appended as one compact line to
+    ``<storage_file>.journal`` instead of rewriting the whole catalog. The journal is
+    folded back into the JSON snapshot once it holds ``compact_every`` records, and
+    whenever ``save`` is called.
+
+    With ``lazy`` enabled nothing is parsed up front. Listing streams records
+    straight from the file until some command needs the in-memory indexes, at which
+    point the collection is loaded as usual. Counts and statistics take one streaming
+    pass, whose counters are kept until the file changes.
+
+    Several processes may share one catalog. Changes happen under an exclusive lock
+    on ``<storage_file>.lock``, snapshots are written to a temporary file and renamed
+    into place, and before each operation the snapshot and journal are checked for
+    changes (inode, mtime, size). Only then is anything re-read: a new snapshot is
+    reloaded, while records appended to the journal are replayed from where this
+    process stopped reading.
+
+    Snapshots and journals are numbered so a crash while compacting can't replay a
+    journal into the snapshot that already holds it. Each journal starts with a
+    ``{"generation": n}`` line, and before a snapshot is renamed into place
+    ``<storage_file>.generation`` records the journal generation it absorbs together
+    with its signature (kept by the rename). On load, a journal the snapshot has
+    already absorbed is dropped instead of replayed."""
+
+    def __init__(self, storage_file="books_data.json", use_journal=True, compact_every=1000, lazy=False):
+        self.storage_file = storage_file
+        self.journal_file = storage_file + ".journal"
+        self.generation_file = storage_file + ".generation"
+        self.lock_file = storage_file + ".lock"
+        self.use_journal = use_journal
+        self.compact_every = compact_every
+        self._loaded = False
+        self._unsaved = False
+        self._lock_depth = 0
+        self._file_stats = None
+        if not lazy:
+            self.load()
+
+    def load(self):
+        """Load saved books from the JSON file, then replay any journaled changes.
+        If the file doesn't exist or is corrupted, start with an empty collection."""
+        with self._locked():
+            self._snapshot_signature = file_signature(self.storage_file)
+            try:
+                with open(self.storage_file, "r") as file:
+                    loaded_books = json.load(file)
+            except (FileNotFoundError, json.JSONDecodeError):
+                loaded_books = []
+            self._rebuild_indexes(loaded_books)
+            self._generation = self._snapshot_generation()
+            self._journal_length = 0
+            self._journal_offset = 0
+            self._journal_inode = None
+            self._replay_journal()
+            self._loaded = True
+            self._unsaved = False
+
+    def save(self):
+        """Write a full snapshot of the collection and drop the journal it replaces.
+        A lazy collection that was never loaded has nothing new to write."""
+        if not self._loaded:
+            return
+        with self._locked():
+            self._refresh()
+            self._write_snapshot()
+
+    def batch(self):
+        """Hold the catalog lock so other processes can't interleave with a bulk change."""
+        return self._locked()
+
+    def get(self, title):
+        self._ensure_loaded()
+        book_id = self._find_book_id(title)
+        return None if book_id is None else self._books[book_id]
+
+    def add(self, book):
+        with self._locked():
+            self._ensure_loaded()
+            book_id = self._insert_book(book)
+            self._persist_change({"op": "add", "book": self._books[book_id].to_dict()})
+
+    def add_many(self, books):
+        self._ensure_loaded()
+        for book in books:
+            self._insert_book(book)
+        self._unsaved = True
+
+    def update(self, title, changes):
+        with self._locked():
+            self._ensure_loaded()
+            book_id = self._find_book_id(title)
+            if book_id is None:
+                return False
+            self._update_book(book_id, changes)
+            self._persist_change({"op": "update", "title": title, "book": changes})
+            return True
+
+    def delete(self, title):
+        with self._locked():
+            self._ensure_loaded()
+            book_id = self._find_book_id(title)
+            if book_id is None:
+                return False
+            self._remove_book(book_id)
+            self._persist_change({"op": "delete", "title": title})
+            return True
+
+    def search(self, text, fields=SEARCH_FIELDS):
+        self._ensure_loaded()
+        text = text.casefold()
+        found_ids = set()
+        for field in fields:
+            found_ids.update(self._search_field(text, field))
+        return [self._books[book_id] for book_id in sorted(found_ids)]
+
+    def books_by_author(self, author):
+        self._ensure_loaded()
+        return [
+            self._books[book_id]
+            for book_id in sorted(self._author_index.get(author.casefold(), ()))
+        ]
+
+    def iter_books(self, fields=None):
+        if self._can_stream():
+            return iter_books_from_file(self.storage_file, fields)
+        self._ensure_loaded()
+        books = list(self._books.values())
+        if fields is None:
+            return iter(books)
+        return ({field: book[field] for field in fields} for book in books)
+
+    def list_books(self, sort_by=None, descending=False, offset=0, limit=None):
+        if sort_by is not None and sort_by not in SORT_FIELDS:
+            raise ValueError(f"Can't sort books by {sort_by!r}")
+        stop = None if limit is None else offset + limit
+        if sort_by is None:
+            if not descending:
+                return list(itertools.islice(self.iter_books(), offset, stop))
+            self._ensure_loaded()
+            book_ids = itertools.islice(reversed(self._books), offset, stop)
+            return [self._books[book_id] for book_id in book_ids]
+
+        self._ensure_loaded()
+        entries = self._sorted_index(sort_by)
+        if descending:
+            end = max(len(entries) - offset, 0)
+            start = 0 if limit is None else max(end - limit, 0)
+            page = entries[start:end][::-1]
+        else:
+            page = entries[offset:stop]
+        return [self._books[book_id] for _, book_id in page]
+
+    def count(self):
+        return self._reading_stats().total
+
+    def count_read(self):
+        return self._reading_stats().read
+
+    def progress(self):
+        stats = self._reading_stats()
+        return stats.total, stats.read
+
+    def stats(self):
+        return self._reading_stats().as_dict()
+
+    def _reading_stats(self):
+        """Return the running ReadingStats. A lazy collection that isn't loaded gets
+        them from one streaming pass over the file, reused until the file changes."""
+        if not self._can_stream():
+            self._ensure_loaded()
+            return self._stats
+        signature = file_signature(self.storage_file)
+        if self._file_stats is None or self._file_stats[0] != signature:
+            stats = ReadingStats()
+            fields = ("read", *STATS_GROUPS.values())
+            for book in iter_books_from_file(self.storage_file, fields):
+                stats.tally(book, 1)
+            self._file_stats = (signature, stats)
+        return self._file_stats[1]
+
+    def _ensure_loaded(self):
+        """Load the collection into memory if a lazy storage hasn't done so yet,
+        otherwise pick up whatever other processes changed since the last look."""
+        if not self._loaded:
+            self.load()
+        else:
+            self._refresh()
+
+    def _refresh(self):
+        """Catch up with changes other processes made to the snapshot or journal.
+        In-memory changes that aren't saved yet (see ``add_many``) are never dropped."""
+        if self._unsaved or not self._changed_on_disk():
+            return
+        with self._locked():
+            if file_signature(self.storage_file) != self._snapshot_signature:
+                self.load()
+                return
+            try:
+                journal = os.stat(self.journal_file)
+            except FileNotFoundError:
+                if self._journal_offset:
+                    self.load()
+                return
+            if journal.st_ino != self._journal_inode or journal.st_size < self._journal_offset:
+                self.load()
+            elif journal.st_size > self._journal_offset:
+                self._replay_journal()
+
+    def _changed_on_disk(self):
+        """Cheap check (two stat calls) for whether the files differ from what was read."""
+        if file_signature(self.storage_file) != self._snapshot_signature:
+            return True
+        try:
+            journal = os.stat(self.journal_file)
+        except FileNotFoundError:
+            return self._journal_offset != 0
+        return journal.st_ino != self._journal_inode or journal.st_size != self._journal_offset
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Hold the cross-process lock on the catalog; re-entrant within this object."""
+        if self._lock_depth:
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+            return
+
+        with file_lock(self.lock_file):
+            self._lock_depth = 1
+            try:
+                yield
+            finally:
+                self._lock_depth = 0
+
+    def _snapshot_generation(self):
+        """Return the last journal generation folded into the snapshot on disk.
+
+        The generation file names the snapshot it was written for; if that snapshot
+        never made it into place (a crash before the rename), the one on disk is the
+        previous snapshot and holds only the previous generation."""
+        try:
+            with open(self.generation_file, "r") as file:
+                state = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return 0
+        if state["snapshot"] == list(self._snapshot_signature or ()):
+            return state["generation"]
+        return state["previous"]
+
+    def _write_snapshot(self):
+        """Atomically replace the JSON file with the in-memory collection, then drop
+        the journal it supersedes. Must be called with the lock held.
+
+        The generation file is replaced first, so a crash at any point leaves either
+        the old snapshot with its journal, or the new one with a journal that load
+        knows to ignore."""
+        generation = self._generation + 1
+        directory = os.path.dirname(os.path.abspath(self.storage_file))
+        prefix = os.path.basename(self.storage_file) + "."
+        descriptor, temporary_file = tempfile.mkstemp(suffix=".tmp", prefix=prefix, dir=directory)
+        try:
+            with os.fdopen(descriptor, "w") as file:
+                write_books(file, self._books.values())
+                file.flush()
+                os.fsync(file.fileno())
+            if os.path.exists(self.storage_file):
+                shutil.copymode(self.storage_file, temporary_file)
+            state = {
+                "generation": generation,
+                "snapshot": list(file_signature(temporary_file)),
+                "previous": self._generation,
+            }
+            self._replace_file(self.generation_file, json.dumps(state))
+            os.replace(temporary_file, self.storage_file)
+        except BaseException:
+            if os.path.exists(temporary_file):
+                os.remove(temporary_file)
+            raise
+
+        self._generation = generation
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        self._snapshot_signature = file_signature(self.storage_file)
+        self._journal_length = 0
+        self._journal_offset = 0
+        self._journal_inode = None
+        self._unsaved = False
+
+    def _replace_file(self, path, text):
+        """Atomically replace a small file with ``text``."""
+        temporary_file = path + ".tmp"
+        with open(temporary_file, "w") as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_file, path)
+
+    def _can_stream(self):
+        """Whether reads can come straight from the file: the collection isn't loaded
+        and there are no journaled changes that would have to be replayed first."""
+        if self._loaded:
+            return False
+        try:
+            return os.path.getsize(self.journal_file) == 0
+        except OSError:
+            return True
+
+    def _rebuild_indexes(self, books):
+        """Reset the in-memory store and all indexes from a list of books."""
+        self._books = {}
+        self._title_index = {}
+        self._author_index = {}
+        self._folded_fields = {}
+        self._trigram_index = {field: {} for field in SEARCH_FIELDS}
+        self._stats = ReadingStats()
+        self._sorted_indexes = {}
+        self._next_id = 0
+        for book in books:
+            self._insert_book(book)
+
+    def _sorted_index(self, field):
+        """Return the ``(sort key, id)`` list ordering every book by ``field``.
+        It is sorted once on first use and then kept up to date as books change."""
+        entries = self._sorted_indexes.get(field)
+        if entries is None:
+            entries = sorted(
+                (sort_key(book, field), book_id) for book_id, book in self._books.items()
+            )
+            self._sorted_indexes[field] = entries
+        return entries
+
+    def _insert_book(self, book):
+        """Store a book as a compact Book record and register it in the indexes."""
+        if not isinstance(book, Book):
+            book = Book.from_dict(book)
+        book_id = self._next_id
+        self._next_id += 1
+        self._books[book_id] = book
+        self._index_book(book_id, book)
+        return book_id
+
+    def _index_book(self, book_id, book):
+        """Add a stored book to the title, author and trigram indexes."""
+        folded = {field: getattr(book, field).casefold() for field in SEARCH_FIELDS}
+        self._folded_fields[book_id] = folded
+        # An edited book is re-indexed under its old id, which must keep its place
+        # among other books sharing the title.
+        bisect.insort(self._title_index.setdefault(folded["title"], []), book_id)
+        self._author_index.setdefault(folded["author"], set()).add(book_id)
+        self._stats.tally(book, 1)
+        for field, entries in self._sorted_indexes.items():
+            bisect.insort(entries, (sort_key(book, field), book_id))
+        for field, value in folded.items():
+            postings = self._trigram_index[field]
+            for trigram in trigrams(value):
+                postings.setdefault(trigram, set()).add(book_id)
+
+    def _unindex_book(self, book_id, book):
+        """Remove a stored book from the title, author and trigram indexes."""
+        folded = self._folded_fields.pop(book_id)
+        self._stats.tally(book, -1)
+        for field, entries in self._sorted_indexes.items():
+            del entries[bisect.bisect_left(entries, (sort_key(book, field), book_id))]
+
+        title_ids = self._title_index[folded["title"]]
+        title_ids.remove(book_id)
+        if not title_ids:
+            del self._title_index[folded["title"]]
+
+        author_ids = self._author_index[folded["author"]]
+        author_ids.discard(book_id)
+        if not author_ids:
+            del self._author_index[folded["author"]]
+
+        for field, value in folded.items():
+            postings = self._trigram_index[field]
+            for trigram in trigrams(value):
+                book_ids = postings[trigram]
+                book_ids.discard(book_id)
+                if not book_ids:
+                    del postings[trigram]
+
+    def _search_field(self, text, field):
+        """Return the ids of books whose case-folded ``field`` contains ``text``.
+
+        Candidates are the intersection of the posting sets of the query's trigrams,
+        smallest first; each candidate is then checked, since sharing every trigram
+        doesn't guarantee they are adjacent. Queries shorter than a trigram have no
+        postings to use and are checked against every book."""
+        query_trigrams = trigrams(text)
+        if not query_trigrams:
+            candidates = self._folded_fields.keys()
+        else:
+            postings = self._trigram_index[field]
+            posting_sets = sorted(
+                (postings.get(trigram, set()) for trigram in query_trigrams), key=len
+            )
+            candidates = set(posting_sets[0]).intersection(*posting_sets[1:])
+        return [
+            book_id
+            for book_id in candidates
+            if text in self._folded_fields[book_id][field]
+        ]
+
+    def _find_book_id(self, title):
+        """Return the id of the first book with the given title (case-insensitive), or None."""
+        title_ids = self._title_index.get(title.casefold())
+        return title_ids[0] if title_ids else None
+
+    def _update_book(self, book_id, changes):
+        """Apply field changes to a stored book, keeping the indexes in sync."""
+        book = self._books[book_id]
+        self._unindex_book(book_id, book)
+        book.update(changes)
+        self._index_book(book_id, book)
+
+    def _remove_book(self, book_id):
+        """Drop a stored book and its index entries."""
+        book = self._books.pop(book_id)
+        self._unindex_book(book_id, book)
+        return book
+
+    def _replay_journal(self):
+        """Apply the journal records written since this process last read it.
+
+        Only complete lines are consumed, so a record another process is still
+        appending is picked up next time. A line torn by a crash is skipped. A
+        journal whose generation the snapshot already absorbed (left behind by a
+        crash while compacting) is deleted rather than replayed; journals written
+        before generations existed have no header and are always replayed."""
+        try:
+            file = open(self.journal_file, "rb")
+        except FileNotFoundError:
+            return
+        stale = False
+        with file:
+            self._journal_inode = os.fstat(file.fileno()).st_ino
+            file.seek(self._journal_offset)
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    change = json.loads(line)
+                except json.JSONDecodeError:
+                    self._journal_offset += len(line)
+                    continue
+                if "generation" in change:
+                    stale = change["generation"] <= self._generation
+                    if stale:
+                        break
+                    self._journal_offset += len(line)
+                    continue
+                self._journal_offset += len(line)
+                self._apply_change(change)
+                self._journal_length += 1
+        if stale:
+            os.remove(self.journal_file)
+            self._journal_offset = 0
+            self._journal_inode = None
+
+    def _apply_change(self, change):
+        """Apply one journal record to the in-memory collection."""
+        operation = change["op"]
+        if operation == "add":
+            self._insert_book(change["book"])
+            return
+
+        book_id = self._find_book_id(change["title"])
+        if book_id is None:
+            return
+        if operation == "delete":
+            self._remove_book(book_id)
+        elif operation == "update":
+            self._update_book(book_id, change["book"])
+
+    def _persist_change(self, change):
+        """Make a change durable, either as a journal record or as a full rewrite.
+        Must be called with the lock held, right after catching up with the files."""
+        if not self.use_journal:
+            self._write_snapshot()
+            return
+
+        with open(self.journal_file, "ab") as file:
+            if file.tell() == 0:
+                header = {"generation": self._generation + 1}
+                file.write(json.dumps(header, separators=(",", ":")).encode() + b"\n")
+            elif file.tell() > self._journal_offset:
+                # Whatever follows the last complete record was torn by a crash;
+                # end that line so the new record stays readable.
+                file.write(b"\n")
+            file.write(json.dumps(change, separators=(",", ":")).encode() + b"\n")
+            file.flush()
+            self._journal_offset = file.tell()
+            self._journal_inode = os.fstat(file.fileno()).st_ino
+        self._journal_length += 1
+        if self._journal_length >= self.compact_every:
+            self._write_snapshot()
+
+
+class SqliteStorage(BookStorage):
+    """Keep the collection in a SQLite database so nothing is loaded wholesale.
+
+    Lookups, search, listing and reading-progress counts are all answered by SQL.
+    Case-folded copies of the title and author are stored alongside the originals
+    (SQLite's own ``lower`` only folds ASCII) and indexed together with genre, year
+    and read status. When SQLite is built with FTS5, substring search uses a trigram
+    full-text table over those keys, kept in sync by triggers. Reading-progress
+    statistics live in a ``book_stats`` counter table that triggers adjust on every
+    insert, update and delete, so reading them never counts rows."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            author TEXT NOT NULL,
+            year TEXT NOT NULL,
+            genre TEXT NOT NULL,
+            read INTEGER NOT NULL,
+            title_key TEXT NOT NULL,
+            author_key TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS books_title_key ON books (title_key);
+        CREATE INDEX IF NOT EXISTS books_author_key ON books (author_key);
+        CREATE INDEX IF NOT EXISTS books_genre ON books (genre);
+        CREATE INDEX IF NOT EXISTS books_year ON books (year);
+        CREATE INDEX IF NOT EXISTS books_year_order ON books (
+            (year = '' OR year GLOB '*[^0-9]*'), CAST(year AS INTEGER), year
+        );
+        CREATE INDEX IF NOT EXISTS books_read ON books (read);
+    """
+
+    # Same order as ``sort_key``: numeric years by value, then the rest as text.
+    # Matches the books_year_order index expression for expression.
+    YEAR_ORDER = ("(year = '' OR year GLOB '*[^0-9]*')", "CAST(year AS INTEGER)", "year")
+
+    FULLTEXT_SCHEMA = """
+        CREATE VIRTUAL TABLE books_fts USING fts5(
+            title_key, author_key, content='books', content_rowid='id', tokenize='trigram'
+        );
+        CREATE TRIGGER books_fts_insert AFTER INSERT ON books BEGIN
+            INSERT INTO books_fts (rowid, title_key, author_key)
+            VALUES (new.id, new.title_key, new.author_key);
+        END;
+        CREATE TRIGGER books_fts_delete AFTER DELETE ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title_key, author_key)
+            VALUES ('delete', old.id, old.title_key, old.author_key);
+        END;
+        CREATE TRIGGER books_fts_update AFTER UPDATE ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title_key, author_key)
+            VALUES ('delete', old.id, old.title_key, old.author_key);
+            INSERT INTO books_fts (rowid, title_key, author_key)
+            VALUES (new.id, new.title_key, new.author_key);
+        END;
+        INSERT INTO books_fts (books_fts) VALUES ('rebuild');
+    """
+
+    STATS_SCHEMA = """
+        CREATE TABLE book_stats (
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            total INTEGER NOT NULL,
+            read INTEGER NOT NULL,
+            PRIMARY KEY (dimension, value)
+        );
+        CREATE TRIGGER books_stats_insert AFTER INSERT ON books BEGIN
+            INSERT INTO book_stats (dimension, value, total, read)
+            VALUES ('all', '', 1, new.read), ('genre', new.genre, 1, new.read),
+                   ('author', new.author, 1, new.read), ('year', new.year, 1, new.read)
+            ON CONFLICT (dimension, value)
+            DO UPDATE SET total = total + excluded.total, read = read + excluded.read;
+        END;
+        CREATE TRIGGER books_stats_delete AFTER DELETE ON books BEGIN
+            UPDATE book_stats SET total = total - 1, read = read - old.read
+            WHERE (dimension, value) IN (VALUES ('all', ''), ('genre', old.genre),
+                                                ('author', old.author), ('year', old.year));
+            DELETE FROM book_stats WHERE total = 0 AND dimension != 'all';
+        END;
+        CREATE TRIGGER books_stats_update AFTER UPDATE ON books BEGIN
+            UPDATE book_stats SET total = total - 1, read = read - old.read
+            WHERE (dimension, value) IN (VALUES ('all', ''), ('genre', old.genre),
+                                                ('author', old.author), ('year', old.year));
+            INSERT INTO book_stats (dimension, value, total, read)
+            VALUES ('all', '', 1, new.read), ('genre', new.genre, 1, new.read),
+                   ('author', new.author, 1, new.read), ('year', new.year, 1, new.read)
+            ON CONFLICT (dimension, value)
+            DO UPDATE SET total = total + excluded.total, read = read + excluded.read;
+            DELETE FROM book_stats WHERE total = 0 AND dimension != 'all';
+        END;
+        INSERT INTO book_stats (dimension, value, total, read)
+        SELECT 'all', '', COUNT(*), COALESCE(SUM(read), 0) FROM books;
+        INSERT INTO book_stats (dimension, value, total, read)
+        SELECT 'genre', genre, COUNT(*), SUM(read) FROM books GROUP BY genre;
+        INSERT INTO book_stats (dimension, value, total, read)
+        SELECT 'author', author, COUNT(*), SUM(read) FROM books GROUP BY author;
+        INSERT INTO book_stats (dimension, value, total, read)
+        SELECT 'year', year, COUNT(*), SUM(read) FROM books GROUP BY year;
+    """
+
+    COLUMNS = "title, author, year, genre, read"
+
+    def __init__(self, database_file="books_data.db"):
+        self.database_file = database_file
+        self.connection = sqlite3.connect(database_file)
+        self.connection.executescript(self.SCHEMA)
+        self.has_fulltext = self._create_derived_table("books_fts", self.FULLTEXT_SCHEMA)
+        if not self._create_derived_table("book_stats", self.STATS_SCHEMA):
+            raise sqlite3.OperationalError("could not create the book_stats table")
+
+    def _create_derived_table(self, name, schema):
+        """Create a table derived from ``books`` (with its triggers and initial contents)
+        unless it already exists. Returns False if this SQLite build can't create it,
+        e.g. FTS5 is missing."""
+        exists = self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = ?", (name,)
+        ).fetchone()
+        if exists:
+            return True
+        try:
+            self.connection.executescript("BEGIN;" + schema + "COMMIT;")
+        except sqlite3.OperationalError:
+            self.connection.rollback()
+            return False
+        return True
+
+    def load(self):
+        """Nothing to load: every query goes straight to the database."""
+
+    def save(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def get(self, title):
+        row = self.connection.execute(
+            f"SELECT {self.COLUMNS} FROM books WHERE title_key = ? ORDER BY id LIMIT 1",
+            (title.casefold(),),
+        ).fetchone()
+        return None if row is None else self._row_to_book(row)
+
+    def add(self, book):
+        with self.connection:
+            self.add_many([book])
+
+    def add_many(self, books):
+        self.connection.executemany(
+            "INSERT INTO books (title, author, year, genre, read, title_key, author_key)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (self._book_to_row(book) for book in books),
+        )
+
+    def update(self, title, changes):
+        book_id = self._find_book_id(title)
+        if book_id is None:
+            return False
+        book = self._row_to_book(
+            self.connection.execute(
+                f"SELECT {self.COLUMNS} FROM books WHERE id = ?", (book_id,)
+            ).fetchone()
+        )
+        book.update(changes)
+        with self.connection:
+            self.connection.execute(
+                "UPDATE books SET title = ?, author = ?, year = ?, genre = ?, read = ?,"
+                " title_key = ?, author_key = ? WHERE id = ?",
+                (*self._book_to_row(book), book_id),
+            )
+        return True
+
+    def delete(self, title):
+        book_id = self._find_book_id(title)
+        if book_id is None:
+            return False
+        with self.connection:
+            self.connection.execute("DELETE FROM books WHERE id = ?", (book_id,))
+        return True
+
+    def search(self, text, fields=SEARCH_FIELDS):
+        text = text.casefold()
+        if self.has_fulltext and len(text) >= 3:
+            # A quoted trigram phrase matches exactly the rows containing the substring.
+            columns = " ".join(f"{field}_key" for field in fields)
+            phrase = '"' + text.replace('"', '""') + '"'
+            rows = self.connection.execute(
+                f"SELECT {self.COLUMNS} FROM books WHERE id IN"
+                " (SELECT rowid FROM books_fts WHERE books_fts MATCH ?) ORDER BY id",
+                (f"{{{columns}}} : {phrase}",),
+            )
+        else:
+            condition = " OR ".join(f"instr({field}_key, ?) > 0" for field in fields)
+            rows = self.connection.execute(
+                f"SELECT {self.COLUMNS} FROM books WHERE {condition} ORDER BY id",
+                (text,) * len(fields),
+            )
+        return [self._row_to_book(row) for row in rows]
+
+    def books_by_author(self, author):
+        rows = self.connection.execute(
+            f"SELECT {self.COLUMNS} FROM books WHERE author_key = ? ORDER BY id",
+            (author.casefold(),),
+        )
+        return [self._row_to_book(row) for row in rows]
+
+    def list_books(self, sort_by=None, descending=False, offset=0, limit=None):
+        if sort_by is None:
+            order = ["id"]
+        elif sort_by in SEARCH_FIELDS:
+            order = [f"{sort_by}_key"]
+        elif sort_by == "year":
+            order = list(self.YEAR_ORDER)
+        elif sort_by in SORT_FIELDS:
+            order = [sort_by]
+        else:
+            raise ValueError(f"Can't sort books by {sort_by!r}")
+        direction = "DESC" if descending else "ASC"
+        order_by = ", ".join(f"{term} {direction}" for term in order + ["id"])
+        rows = self.connection.execute(
+            f"SELECT {self.COLUMNS} FROM books ORDER BY {order_by}"
+            " LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset),
+        )
+        return [self._row_to_book(row) for row in rows]
+
+    def iter_books(self, fields=None):
+        if fields is None:
+            for row in self.connection.execute(f"SELECT {self.COLUMNS} FROM books ORDER BY id"):
+                yield self._row_to_book(row)
+            return
+
+        columns = ", ".join(fields) or "id"
+        for row in self.connection.execute(f"SELECT {columns} FROM books ORDER BY id"):
+            book = dict(zip(fields, row))
+            if "read" in book:
+                book["read"] = bool(book["read"])
+            yield book
+
+    def count(self):
+        row = self.connection.execute(
+            "SELECT total FROM book_stats WHERE dimension = 'all'"
+        ).fetchone()
+        return 0 if row is None else row[0]
+
+    def count_read(self):
+        row = self.connection.execute(
+            "SELECT read FROM book_stats WHERE dimension = 'all'"
+        ).fetchone()
+        return 0 if row is None else row[0]
+
+    def progress(self):
+        row = self.connection.execute(
+            "SELECT total, read FROM book_stats WHERE dimension = 'all'"
+        ).fetchone()
+        return (0, 0) if row is None else tuple(row)
+
+    def stats(self):
+        stats = {"total": 0, "read": 0, **{group: {} for group in STATS_GROUPS}}
+        groups = {field: group for group, field in STATS_GROUPS.items()}
+        for dimension, value, total, read in self.connection.execute(
+            "SELECT dimension, value, total, read FROM book_stats"
+        ):
+            if dimension == "all":
+                stats["total"], stats["read"] = total, read
+            else:
+                stats[groups[dimension]][value] = {"total": total, "read": read}
+        return stats
+
+    def _find_book_id(self, title):
+        """Return the id of the first book with the given title (case-insensitive), or None."""
+        row = self.connection.execute(
+            "SELECT id FROM books WHERE title_key = ? ORDER BY id LIMIT 1",
+            (title.casefold(),),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    @staticmethod
+    def _book_to_row(book):
+        """Turn a book dict into the values of an INSERT/UPDATE statement."""
+        return (
+            book["title"],
+            book["author"],
+            book["year"],
+            book["genre"],
+            int(bool(book["read"])),
+            book["title"].casefold(),
+            book["author"].casefold(),
+        )
+
+    @staticmethod
+    def _row_to_book(row):
+        """Turn a selected row back into a book dict."""
+        title, author, year, genre, read = row
+        return {"title": title, "author": author, "year": year, "genre": genre, "read": bool(read)}
+
+
+def migrate_json_to_sqlite(json_file, database_file):
+    """Copy every book from a JSON catalog (plus its journal) into a SQLite database.
+    Returns the number of books migrated."""
+    source = JsonStorage(json_file)
+    target = SqliteStorage(database_file)
+    try:
+        target.add_many(source.iter_books())
+        target.save()
+        return source.count()
+    finally:
+        target.close()
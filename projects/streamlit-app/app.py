@@ -1,28 +1,312 @@
 import streamlit as st
-import pandas as pd
 import os
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
 
+from sweeper import (COMPRESSIONS, DEFAULT_MAX_POINTS, DOWNSAMPLING, INPUT_EXTENSIONS, OUTPUT_FORMATS, FrameCache,
+                     content_hash, convert_frame, default_cache_bytes, downsample, parse_upload, read_columns,
+                     read_sample, sheet_names, stream_clean_file)
+from pipeline import Pipeline
+from profiling import profile_file
+
 # Setup our App
 st.set_page_config(page_title="⚙ Data Sweeper", layout="wide")
 st.title("Data Sweeper")
-st.write("Transform your files between CSV and Excel formats with built-in data cleaning and visualization!")
+st.write("Transform your files between CSV, Excel, Parquet and Feather formats with built-in data cleaning and visualization!")
+
+@st.cache_resource
+def get_frame_cache():
+    """One cache of parsed uploads shared by every session, so reruns don't reparse."""
+    return FrameCache(default_cache_bytes())
+
+
+@st.cache_resource
+def get_process_pool():
+    """Worker processes shared by every session, for parsing and converting several
+    uploads at once. ``DATA_SWEEPER_WORKERS`` sets how many (one per CPU by default,
+    0 for none: everything then runs in the server process).
+
+    Streamlit runs this page as ``__main__``, which spawned workers would run again,
+    so workers are forked; without fork (Windows) there is no pool. Forking a
+    multi-threaded process like the Streamlit server can deadlock a child that
+    inherits a lock held by another thread (Python 3.12+ warns about it). Workers
+    only run self-contained parsing and conversion, but if they hang, set
+    ``DATA_SWEEPER_WORKERS=0``."""
+    workers = int(os.environ.get("DATA_SWEEPER_WORKERS", os.cpu_count() or 1))
+    if workers <= 0 or "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+
+
+def discard_process_pool(pool):
+    """Drop a pool whose worker died (e.g. killed for running out of memory): a broken
+    pool refuses all new work, so the next call to ``get_process_pool`` builds a fresh one."""
+    pool.shutdown(wait=False, cancel_futures=True)
+    if get_process_pool() is pool:
+        get_process_pool.clear()
+
+
+@st.cache_resource
+def get_output_cache():
+    """Converted files shared by every session, keyed by the frame they came from and
+    the output format, so downloading the same thing again doesn't re-serialize it."""
+    return FrameCache(default_cache_bytes("DATA_SWEEPER_OUTPUT_CACHE_MB", 256), size=len)
+
+
+def run_in_pool(function, *args):
+    """Submit ``function(*args)`` to the process pool, or run it right away if there's
+    none or the pool is broken. Collect the outcome with ``pool_result``."""
+    pool = get_process_pool()
+    if pool is not None:
+        try:
+            future = pool.submit(function, *args)
+        except BrokenProcessPool:
+            discard_process_pool(pool)
+        else:
+            future.pool = pool
+            return future
+    future = Future()
+    try:
+        future.set_result(function(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def pool_result(future):
+    """The result of a ``run_in_pool`` future. If its worker died, the pool is
+    discarded before the error is raised, so later work gets a fresh pool."""
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        discard_process_pool(future.pool)
+        raise
+
+
+def upload_key(file):
+    """Content hash of an upload, computed once per upload rather than on every rerun."""
+    hashes = st.session_state.setdefault("upload_hashes", {})
+    if file.file_id not in hashes:
+        hashes[file.file_id] = content_hash(file.getvalue())
+    return hashes[file.file_id]
+
+
+def upload_sheet(file, file_ext):
+    """The sheet to read from an Excel upload: the one picked on the page, else the
+    first. None for other file types. Sheet names are read once per upload."""
+    if file_ext != ".xlsx":
+        return None
+    sheets = st.session_state.setdefault("upload_sheets", {})
+    if file.file_id not in sheets:
+        sheets[file.file_id] = sheet_names(file)
+    chosen = st.session_state.get(f"sheet_{file.name}")
+    return chosen if chosen in sheets[file.file_id] else sheets[file.file_id][0]
+
+
+def choose_sheet(file, file_ext):
+    """Sheet picker for workbooks with more than one sheet. Returns the sheet to read."""
+    sheet = upload_sheet(file, file_ext)
+    sheets = st.session_state["upload_sheets"][file.file_id] if sheet is not None else []
+    if len(sheets) > 1:
+        sheet = st.selectbox(f"Sheet of {file.name}", sheets, index=sheets.index(sheet), key=f"sheet_{file.name}")
+    return sheet
+
+
+def show_profile(file, file_ext, sheet=None):
+    """Approximate profile of the whole file, built in one streaming pass when asked
+    for and cached per file content."""
+    st.subheader("📋 Dataset Profile")
+    if st.checkbox(f"Profile {file.name}", key=f"profile_{file.name}"):
+        with st.spinner(f"Profiling {file.name}..."):
+            profile = get_frame_cache().get_or_parse(
+                (upload_key(file), file_ext, sheet, "profile"), lambda: profile_file(file, file_ext, sheet=sheet)
+            )
+        st.write(f"**Rows:** {profile.attrs['rows']}")
+        st.dataframe(profile)
+        st.caption("≈ marks estimates: distinct counts from HyperLogLog, quantiles from a streaming sketch, "
+                   "top value counts from Misra-Gries counters.")
+
+
+def show_streaming_options(file, file_ext, sheet=None):
+    """Clean and convert a CSV or Excel file chunk by chunk instead of loading it into
+    a DataFrame. Only a sample is parsed for the preview and the column list."""
+    st.write(f"**File Name:** {file.name}")
+    st.write(f"**File Size:** {file.size / 1024:.2f} KB")
+    
+    sample = read_sample(file, file_ext, sample_rows=1000, sheet=sheet)
+    st.write("### Preview of Data")
+    st.dataframe(sample.head())
+    
+    show_profile(file, file_ext, sheet)
+    
+    st.subheader("🛠 Data Cleaning Options")
+    remove_duplicates = st.checkbox(f"Remove Duplicates from {file.name}", key=f"stream_dedup_{file.name}")
+    spill_partitions = 0
+    if remove_duplicates and st.checkbox("Partition duplicate hashes on disk (for tens of millions of distinct rows)",
+                                         key=f"stream_spill_{file.name}"):
+        spill_partitions = 64
+    fill_missing = st.checkbox(f"Fill Missing Values for {file.name}", key=f"stream_fill_{file.name}")
+    
+    st.subheader("📌 Select Columns to Keep")
+    selected_columns = st.multiselect(f"Choose columns for {file.name}", sample.columns, default=sample.columns)
+    
+    st.subheader("♻ File Conversion")
+    conversion_type = st.radio(f"Convert {file.name} to:", ["CSV", "Excel"], key=file.name)
+    
+    if st.button(f"Convert {file.name}"):
+        buffer = BytesIO()
+        rows, dropped = stream_clean_file(file, buffer, list(selected_columns), remove_duplicates, fill_missing,
+                                          conversion_type, file_ext=file_ext, sheet=sheet,
+                                          spill_partitions=spill_partitions)
+        st.write(f"✅ Wrote {rows} rows." + (f" Dropped {dropped} duplicate rows." if remove_duplicates else ""))
+        extension, mime_type = OUTPUT_FORMATS[conversion_type]
+        st.download_button(
+            label=f"⬇ Download {file.name} as {conversion_type}",
+            data=buffer.getvalue(),
+            file_name=os.path.splitext(file.name)[0] + extension,
+            mime=mime_type
+        )
+
+
+def load_confirmed(file):
+    """Whether the whole of ``file`` may be parsed: only once asked for, so the sample,
+    profile and column choice come first and the full parse reads only what's kept."""
+    return st.session_state.get("load_all") or st.session_state.get(f"load_{file.name}")
+
+
+def parse_uploads_in_parallel(files):
+    """Parse every upload that is confirmed for loading and isn't cached yet in the
+    process pool, showing each file's progress and caching results as they finish.
+    A single upload is left to the page."""
+    cache = get_frame_cache()
+    pending = []
+    for file in files:
+        file_ext = os.path.splitext(file.name)[-1].lower()
+        if (file_ext not in INPUT_EXTENSIONS or st.session_state.get(f"chunked_{file.name}")
+                or not load_confirmed(file)):
+            continue
+        try:
+            sheet = upload_sheet(file, file_ext)
+        except Exception:
+            continue  # reported when the page reaches this file
+        key = (upload_key(file), file_ext, sheet)
+        sample = cache.get(key + ("sample",))
+        columns = st.session_state.get(f"columns_{file.name}")
+        if sample is not None:
+            columns = columns or list(sample.columns)
+            if cache.get(key + (tuple(columns),)) is not None:
+                continue
+        pending.append((file, file_ext, sheet, key, sample, columns))
+    if len(pending) < 2:
+        return
+    
+    progress = st.progress(0.0, text=f"Parsing {len(pending)} files...")
+    status = {}
+    futures = {}
+    for file, file_ext, sheet, key, sample, columns in pending:
+        status[file.name] = st.empty()
+        status[file.name].write(f"⏳ Parsing {file.name}...")
+        future = run_in_pool(parse_upload, file.getvalue(), file_ext, columns, sample, sheet)
+        futures[future] = (file, key)
+    
+    for done, future in enumerate(as_completed(futures), start=1):
+        file, key = futures[future]
+        try:
+            sample, df = pool_result(future)
+        except Exception as e:
+            status[file.name].error(f"Error reading file {file.name}: {e}")
+        else:
+            cache.put(key + ("sample",), sample)
+            cache.put(key + (tuple(df.columns),), df)
+            status[file.name].write(f"✅ Parsed {file.name} ({len(df)} rows)")
+        progress.progress(done / len(futures), text=f"Parsed {done} of {len(futures)} files")
+
+
+def choose_output_format(label, key):
+    """Output format radio, plus a compression choice for the columnar formats.
+    Returns ``(format, compression)``."""
+    conversion_type = st.radio(label, list(OUTPUT_FORMATS), key=key)
+    compression = None
+    if conversion_type in COMPRESSIONS:
+        compression = st.selectbox(f"{conversion_type} compression", COMPRESSIONS[conversion_type], key=f"compression_{key}")
+    return conversion_type, compression
+
+
+def show_download(container, name, conversion_type, data, key=None):
+    """Download button for a converted file, named after the upload."""
+    extension, mime_type = OUTPUT_FORMATS[conversion_type]
+    container.download_button(
+        label=f"⬇ Download {name} as {conversion_type}",
+        data=data,
+        file_name=os.path.splitext(name)[0] + extension,
+        mime=mime_type,
+        key=key
+    )
+
+
+def convert_all(frames, conversion_type, compression=None):
+    """Convert every file's frame in the process pool, offering each download as it
+    finishes. ``frames`` maps file names to ``(frame key, frame)``; files already
+    converted to this format come straight from the output cache."""
+    progress = st.progress(0.0, text=f"Converting {len(frames)} files...")
+    status = {}
+    futures = {}
+    for name, (frame_key, df) in frames.items():
+        status[name] = st.empty()
+        output_key = frame_key + (conversion_type, compression)
+        data = get_output_cache().get(output_key)
+        if data is not None:
+            show_download(status[name], name, conversion_type, data, key=f"download_all_{name}")
+            continue
+        status[name].write(f"⏳ Converting {name}...")
+        futures[run_in_pool(convert_frame, df, conversion_type, compression)] = (name, output_key)
+    
+    for done, future in enumerate(as_completed(futures), start=1):
+        name, output_key = futures[future]
+        try:
+            data = pool_result(future)
+        except Exception as e:
+            status[name].error(f"Error converting {name}: {e}")
+        else:
+            get_output_cache().put(output_key, data)
+            show_download(status[name], name, conversion_type, data, key=f"download_all_{name}")
+        progress.progress(done / len(futures), text=f"Converted {done} of {len(futures)} files")
+    progress.progress(1.0, text=f"Converted {len(frames)} files")
+
 
 # File uploader
-uploaded_files = st.file_uploader("Upload your files (CSV or Excel):", type=["csv", "xlsx"], accept_multiple_files=True)
+uploaded_files = st.file_uploader("Upload your files (CSV, Excel, Parquet or Feather):", type=[ext[1:] for ext in INPUT_EXTENSIONS], accept_multiple_files=True)
 
 if uploaded_files:
+    if len(uploaded_files) > 1:
+        st.checkbox("Load all files (check their profiles and columns first)", key="load_all")
+    parse_uploads_in_parallel(uploaded_files)
+    frames = {}
+    
     for file in uploaded_files:
         file_ext = os.path.splitext(file.name)[-1].lower()
         
+        if file_ext not in INPUT_EXTENSIONS:
+            st.error(f"Unsupported file type: {file_ext}")
+            continue
+        
         try:
-            if file_ext == ".csv":
-                df = pd.read_csv(file)
-            elif file_ext == ".xlsx":
-                df = pd.read_excel(file, engine='openpyxl')  # Ensure openpyxl is installed
-            else:
-                st.error(f"Unsupported file type: {file_ext}")
-                continue
+            sheet = choose_sheet(file, file_ext)
+        except Exception as e:
+            st.error(f"Error reading file {file.name}: {e}")
+            continue
+        
+        if file_ext in (".csv", ".xlsx") and st.checkbox(f"Process {file.name} in chunks (for files larger than memory)", key=f"chunked_{file.name}"):
+            show_streaming_options(file, file_ext, sheet)
+            continue
+        
+        # Sniff the columns and dtypes from a sample, so the full parse only reads what's kept
+        try:
+            sample = get_frame_cache().get_or_parse(
+                (upload_key(file), file_ext, sheet, "sample"), lambda: read_sample(file, file_ext, sheet=sheet)
+            )
         except Exception as e:
             st.error(f"Error reading file {file.name}: {e}")
             continue
@@ -33,71 +317,117 @@ if uploaded_files:
         
         # Show first 5 rows of the dataframe
         st.write("### Preview of Data")
-        st.dataframe(df.head())
+        st.dataframe(sample.head())
+        
+        show_profile(file, file_ext, sheet)
+        
+        # Column Selection
+        st.subheader("📌 Select Columns to Keep")
+        selected_columns = st.multiselect(f"Choose columns for {file.name}", sample.columns, default=sample.columns, key=f"columns_{file.name}")
+        if not selected_columns:
+            st.warning("Select at least one column to continue.")
+            continue
+        
+        # The full parse waits until the profile and columns have been looked at
+        if not (st.session_state.get("load_all")
+                or st.checkbox(f"Load {file.name} with these columns", key=f"load_{file.name}")):
+            st.info("Load the file to clean, chart and convert it.")
+            continue
+        
+        frame_key = (upload_key(file), file_ext, sheet, tuple(selected_columns))
+        try:
+            df = get_frame_cache().get_or_parse(
+                frame_key,
+                lambda: read_columns(file, file_ext, selected_columns, sample, sheet)
+            )
+        except Exception as e:
+            st.error(f"Error reading file {file.name}: {e}")
+            continue
         
-        # Data Cleaning Options
+        # Data Cleaning Options: the buttons only record steps, applied below when needed
         st.subheader("🛠 Data Cleaning Options")
+        steps = st.session_state.setdefault(f"steps_{file.name}", [])
         if st.checkbox(f"Clean Data for {file.name}"):
             col1, col2 = st.columns(2)
             
-            if f"cleaned_{file.name}" not in st.session_state:
-                st.session_state[f"cleaned_{file.name}"] = df.copy()
-                
-            cleaned_df = st.session_state[f"cleaned_{file.name}"]
-            
             with col1:
                 if st.button(f"Remove Duplicates from {file.name}"):
-                    cleaned_df.drop_duplicates(inplace=True)
-                    st.session_state[f"cleaned_{file.name}"] = cleaned_df
+                    if "remove_duplicates" not in steps:
+                        steps.append("remove_duplicates")
                     st.write("✅ Duplicates Removed!")
-                    st.dataframe(cleaned_df.head())
             
             with col2:
                 if st.button(f"Fill Missing Values for {file.name}"):
-                    numeric_cols = cleaned_df.select_dtypes(include=['number']).columns
-                    cleaned_df[numeric_cols] = cleaned_df[numeric_cols].fillna(cleaned_df[numeric_cols].mean())
-                    st.session_state[f"cleaned_{file.name}"] = cleaned_df
+                    if "fill_missing" not in steps:
+                        steps.append("fill_missing")
                     st.write("✅ Missing Values have been Filled!")
-                    st.dataframe(cleaned_df.head())
         
-        # Column Selection
-        st.subheader("📌 Select Columns to Keep")
-        selected_columns = st.multiselect(f"Choose columns for {file.name}", df.columns, default=df.columns)
-        df = df[selected_columns]
+        pipeline = Pipeline(selected_columns, steps)
+        rows_read = len(df)
+        df = pipeline.apply_cached(df, get_frame_cache(), frame_key)
+        if steps:
+            st.write(f"**Cleaning steps:** {pipeline.describe()}")
+            if "remove_duplicates" in steps:
+                st.write(f"**Duplicate rows dropped:** {rows_read - len(df)}")
+            st.dataframe(df.head())
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button(
+                    label="⬇ Export cleaning pipeline",
+                    data=pipeline.to_json(),
+                    file_name=os.path.splitext(file.name)[0] + "_pipeline.json",
+                    mime="application/json",
+                    key=f"pipeline_{file.name}"
+                )
+            with col2:
+                if st.button(f"Reset cleaning steps for {file.name}"):
+                    steps.clear()
+                    st.rerun()
+        cleaned_key = frame_key + (tuple(steps),)
         
         # Data Visualization
         st.subheader("📊 Data Visualization")
         if st.checkbox(f"Show Visualization for {file.name}"):
             numeric_df = df.select_dtypes(include='number')
             if not numeric_df.empty:
-                st.bar_chart(numeric_df.iloc[:, :2])
+                chart_df = numeric_df.iloc[:, :2]
+                if len(chart_df) > DEFAULT_MAX_POINTS:
+                    # Only a bounded number of points is sent to the browser, however big the file
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        max_points = st.number_input("Max points per column", min_value=10, max_value=100_000,
+                                                     value=DEFAULT_MAX_POINTS, step=100, key=f"max_points_{file.name}")
+                    with col2:
+                        method = st.radio("Downsampling", list(DOWNSAMPLING), horizontal=True, key=f"downsampling_{file.name}")
+                    chart_df = get_frame_cache().get_or_parse(
+                        cleaned_key + ("chart", DOWNSAMPLING[method], max_points),
+                        lambda: downsample(chart_df, max_points, DOWNSAMPLING[method])
+                    )
+                    st.caption(f"Showing {len(chart_df)} points for {len(numeric_df)} rows.")
+                st.bar_chart(chart_df)
             else:
                 st.warning("No numerical columns available for visualization.")
         
         # File Conversion
         st.subheader("♻ File Conversion")
-        conversion_type = st.radio(f"Convert {file.name} to:", ["CSV", "Excel"], key=file.name)
+        conversion_type, compression = choose_output_format(f"Convert {file.name} to:", key=file.name)
         
-        if st.button(f"Convert {file.name}"):
-            buffer = BytesIO()
-            
-            if conversion_type == "CSV":
-                df.to_csv(buffer, index=False)
-                file_name = os.path.splitext(file.name)[0] + ".csv"
-                mime_type = "text/csv"
-            elif conversion_type == "Excel":
-                with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                    df.to_excel(writer, index=False)
-                file_name = os.path.splitext(file.name)[0] + ".xlsx"
-                mime_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            
-            buffer.seek(0)
-            
-            # Provide a workaround for downloading with a filename
-            st.download_button(
-                label=f"⬇ Download {file.name} as {conversion_type}",
-                data=buffer.getvalue(),
-                mime=mime_type
-            )
+        # Serialize only when asked, and only once per frame and format
+        output_key = cleaned_key + (conversion_type, compression)
+        data = get_output_cache().get(output_key)
+        if st.button(f"Convert {file.name}") and data is None:
+            data = convert_frame(df, conversion_type, compression)
+            get_output_cache().put(output_key, data)
+        if data is not None:
+            show_download(st, file.name, conversion_type, data)
+        
+        frames[file.name] = (cleaned_key, df)
+    
+    # Convert every file at once, in parallel
+    if len(frames) > 1:
+        st.subheader("♻ Convert All Files")
+        all_type, all_compression = choose_output_format("Convert all files to:", key="convert_all_type")
+        if st.button("Convert all files"):
+            convert_all(frames, all_type, all_compression)
 
 st.success("🎉 All files processed!")
@@ -0,0 +1,406 @@
+"""Benchmarks for Data Sweeper.
+
+Run from this directory, e.g.:
+
+    python bench.py stream --rows 1000000
+    python bench.py load --rows 1000000
+    python bench.py parallel --files 4 --rows 250000
+    python bench.py formats --rows 200000
+    python bench.py chart --rows 1000000 10000000
+    python bench.py profile --rows 1000000
+    python bench.py excel --rows 100000
+    python bench.py dedupe --rows 1000000 10000000
+    python bench.py dedupe-check
+"""
+
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def make_csv(path, rows, seed=0):
+    """Write a synthetic CSV with numeric gaps, text columns and ~10% duplicate rows."""
+    rng = np.random.default_rng(seed)
+    unique_rows = rows - rows // 10
+    df = pd.DataFrame({
+        "id": np.arange(unique_rows),
+        "amount": rng.normal(100, 15, unique_rows).round(2),
+        "quantity": rng.integers(1, 50, unique_rows).astype(float),
+        "city": rng.choice(["Karachi", "Lahore", "Islamabad", "Quetta", "Peshawar"], unique_rows),
+        "note": rng.choice(["ok", "late", "refund", ""], unique_rows),
+    })
+    df.loc[rng.random(unique_rows) < 0.05, "amount"] = np.nan
+    df.loc[rng.random(unique_rows) < 0.05, "quantity"] = np.nan
+    df = pd.concat([df, df.sample(rows - unique_rows, random_state=seed)])
+    df.to_csv(path, index=False)
+
+
+# Each path runs in a fresh interpreter so its peak RSS isn't polluted by the other.
+# Peak RSS is read from /proc (VmHWM), which unlike ru_maxrss is reset by exec.
+STREAM_SCRIPT = """
+import sys, time
+import pandas as pd
+from sweeper import stream_clean_file
+
+source, destination, mode, chunksize = sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4])
+columns = ["id", "amount", "quantity", "city"]
+start = time.perf_counter()
+if mode == "whole frame":
+    df = pd.read_csv(source)
+    df = df[columns]
+    df = df.drop_duplicates()
+    numeric_cols = df.select_dtypes(include=["number"]).columns
+    df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].mean())
+    df.to_csv(destination, index=False)
+    rows = len(df)
+else:
+    rows, dropped = stream_clean_file(source, destination, columns, remove_duplicates=True,
+                                      fill_missing=True, chunksize=chunksize)
+elapsed = time.perf_counter() - start
+with open("/proc/self/status") as status:
+    peak_kb = next(line.split()[1] for line in status if line.startswith("VmHWM"))
+print(rows, elapsed, peak_kb)
+"""
+
+
+def bench_stream(row_counts, chunksize):
+    """Compare peak memory and throughput of the whole-frame and chunked CSV paths."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"{'rows':>10} {'path':>12} {'seconds':>9} {'rows/s':>10} {'peak RSS MB':>12}")
+    for rows in row_counts:
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "input.csv")
+            make_csv(source, rows)
+            for mode in ["whole frame", "chunked"]:
+                destination = os.path.join(directory, "output.csv")
+                output = subprocess.run(
+                    [sys.executable, "-c", STREAM_SCRIPT, source, destination, mode, str(chunksize)],
+                    cwd=here, capture_output=True, text=True, check=True,
+                ).stdout
+                written, seconds, max_rss_kb = output.split()
+                seconds = float(seconds)
+                print(f"{rows:>10} {mode:>12} {seconds:>9.2f} {rows / seconds:>10.0f} {int(max_rss_kb) / 1024:>12.1f}")
+
+
+def bench_load(rows):
+    """Compare a default full parse followed by projection with a projected parse
+    using the dtypes sniffed from a sample."""
+    from sweeper import frame_size, read_columns, read_sample
+
+    print(f"{'columns':>28} {'path':>10} {'seconds':>9} {'frame MB':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "input.csv")
+        make_csv(source, rows)
+        sample = read_sample(source, ".csv")
+        for columns in [list(sample.columns), ["id", "amount", "city"], ["city"]]:
+            start = time.perf_counter()
+            df = pd.read_csv(source)[columns]
+            default_seconds = time.perf_counter() - start
+            default_size = frame_size(df)
+            del df
+
+            start = time.perf_counter()
+            df = read_columns(source, ".csv", columns, sample)
+            sniffed_seconds = time.perf_counter() - start
+            sniffed_size = frame_size(df)
+            del df
+
+            label = ",".join(columns)
+            print(f"{label:>28} {'default':>10} {default_seconds:>9.2f} {default_size / 2**20:>10.1f}")
+            print(f"{label:>28} {'sniffed':>10} {sniffed_seconds:>9.2f} {sniffed_size / 2**20:>10.1f}")
+
+
+def bench_parallel(files, rows):
+    """Compare parsing and converting several uploads one by one and in a process pool."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    from sweeper import convert_frame, parse_upload
+
+    def process(data):
+        sample, df = parse_upload(data, ".csv")
+        return len(convert_frame(df, "CSV"))
+
+    with tempfile.TemporaryDirectory() as directory:
+        uploads = []
+        for index in range(files):
+            source = os.path.join(directory, f"input{index}.csv")
+            make_csv(source, rows, seed=index)
+            with open(source, "rb") as file:
+                uploads.append(file.read())
+
+    start = time.perf_counter()
+    for data in uploads:
+        process(data)
+    sequential = time.perf_counter() - start
+
+    with ProcessPoolExecutor() as pool:
+        start = time.perf_counter()
+        parsed = pool.map(parse_upload, uploads, [".csv"] * files)
+        list(pool.map(convert_frame, [df for sample, df in parsed], ["CSV"] * files))
+        parallel = time.perf_counter() - start
+
+    print(f"{files} files x {rows} rows on {os.cpu_count()} CPUs")
+    print(f"{'one by one':>12} {sequential:>8.2f}s")
+    print(f"{'pool':>12} {parallel:>8.2f}s  ({sequential / parallel:.1f}x)")
+
+
+def bench_formats(rows):
+    """Compare write time, read time and size of every output format and compression."""
+    from sweeper import COMPRESSIONS, OUTPUT_FORMATS, convert_frame, read_file
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "input.csv")
+        make_csv(source, rows)
+        df = pd.read_csv(source)
+
+    print(f"{rows} rows")
+    print(f"{'format':>20} {'write s':>9} {'read s':>9} {'size MB':>9}")
+    for output_format in OUTPUT_FORMATS:
+        for compression in COMPRESSIONS.get(output_format, [None]):
+            start = time.perf_counter()
+            data = convert_frame(df, output_format, compression)
+            write_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            read_file(io.BytesIO(data), OUTPUT_FORMATS[output_format][0])
+            read_seconds = time.perf_counter() - start
+
+            label = output_format if compression is None else f"{output_format} {compression}"
+            print(f"{label:>20} {write_seconds:>9.2f} {read_seconds:>9.2f} {len(data) / 2**20:>9.1f}")
+
+
+def bench_chart(row_counts, max_points):
+    """Time downsampling two numeric columns for a chart, per method and row count."""
+    from sweeper import DOWNSAMPLING, downsample
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>10} {'method':>10} {'seconds':>9} {'points':>8}")
+    for rows in row_counts:
+        df = pd.DataFrame({"walk": np.cumsum(rng.normal(size=rows)), "noise": rng.normal(size=rows)})
+        df.loc[rng.random(rows) < 0.05, "walk"] = np.nan
+        for label, method in DOWNSAMPLING.items():
+            start = time.perf_counter()
+            chart_df = downsample(df, max_points, method)
+            seconds = time.perf_counter() - start
+            print(f"{rows:>10} {label:>10} {seconds:>9.2f} {len(chart_df):>8}")
+
+
+PROFILE_SCRIPT = """
+import sys, time
+import pandas as pd
+from profiling import profile_file
+
+source, mode = sys.argv[1], sys.argv[2]
+start = time.perf_counter()
+if mode == "exact":
+    df = pd.read_csv(source)
+    df.isna().sum(), df.nunique(), df.select_dtypes("number").quantile([0.25, 0.5, 0.75])
+    [df[col].value_counts().head(5) for col in df.columns]
+else:
+    profile_file(source, ".csv")
+elapsed = time.perf_counter() - start
+with open("/proc/self/status") as status:
+    peak_kb = next(line.split()[1] for line in status if line.startswith("VmHWM"))
+print(elapsed, peak_kb)
+"""
+
+
+def bench_profile(row_counts):
+    """Compare an exact whole-frame profile with the one-pass sketch profile."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"{'rows':>10} {'profile':>10} {'seconds':>9} {'peak RSS MB':>12}")
+    for rows in row_counts:
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "input.csv")
+            make_csv(source, rows)
+            for mode in ["exact", "sketches"]:
+                output = subprocess.run(
+                    [sys.executable, "-c", PROFILE_SCRIPT, source, mode],
+                    cwd=here, capture_output=True, text=True, check=True,
+                ).stdout
+                seconds, max_rss_kb = output.split()
+                print(f"{rows:>10} {mode:>10} {float(seconds):>9.2f} {int(max_rss_kb) / 1024:>12.1f}")
+
+
+EXCEL_SCRIPT = """
+import sys, time
+import pandas as pd
+from sweeper import read_file, read_sample
+
+source, mode = sys.argv[1], sys.argv[2]
+start = time.perf_counter()
+if mode == "read_excel":
+    rows = len(pd.read_excel(source, engine="openpyxl"))
+elif mode == "streaming":
+    rows = len(read_file(source, ".xlsx"))
+else:
+    rows = len(read_sample(source, ".xlsx"))
+elapsed = time.perf_counter() - start
+with open("/proc/self/status") as status:
+    peak_kb = next(line.split()[1] for line in status if line.startswith("VmHWM"))
+print(rows, elapsed, peak_kb)
+"""
+
+
+def bench_excel(row_counts):
+    """Compare pd.read_excel with the streaming read-only XLSX reader (whole sheet and
+    the 10,000-row sample the app reads first)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"{'rows':>10} {'reader':>12} {'seconds':>9} {'peak RSS MB':>12}")
+    for rows in row_counts:
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "input.csv")
+            make_csv(source, rows)
+            workbook = os.path.join(directory, "input.xlsx")
+            pd.read_csv(source).to_excel(workbook, index=False)
+            for mode in ["read_excel", "streaming", "sample"]:
+                output = subprocess.run(
+                    [sys.executable, "-c", EXCEL_SCRIPT, workbook, mode],
+                    cwd=here, capture_output=True, text=True, check=True,
+                ).stdout
+                read, seconds, max_rss_kb = output.split()
+                print(f"{rows:>10} {mode:>12} {float(seconds):>9.2f} {int(max_rss_kb) / 1024:>12.1f}")
+
+
+DEDUPE_SCRIPT = """
+import sys, time
+import pandas as pd
+from sweeper import iter_chunks, row_hashes, stream_clean_file
+
+source, destination, mode = sys.argv[1], sys.argv[2], sys.argv[3]
+start = time.perf_counter()
+if mode == "drop_duplicates":
+    df = pd.read_csv(source)
+    deduplicated = df.drop_duplicates()
+    dropped = len(df) - len(deduplicated)
+    deduplicated.to_csv(destination, index=False)
+elif mode == "python set":
+    seen = set()
+    dropped = 0
+    for index, chunk in enumerate(iter_chunks(source, ".csv")):
+        hashes = row_hashes(chunk)
+        keep = ~pd.Index(hashes).duplicated()
+        keep &= [row_hash not in seen for row_hash in hashes.tolist()]
+        seen.update(hashes.tolist())
+        dropped += len(chunk) - int(keep.sum())
+        chunk[keep].to_csv(destination, index=False, header=not index, mode="a" if index else "w")
+else:
+    rows, dropped = stream_clean_file(source, destination, remove_duplicates=True,
+                                      spill_partitions=64 if mode == "spilled" else 0)
+elapsed = time.perf_counter() - start
+with open("/proc/self/status") as status:
+    peak_kb = next(line.split()[1] for line in status if line.startswith("VmHWM"))
+print(dropped, elapsed, peak_kb)
+"""
+
+
+def bench_dedupe(row_counts):
+    """Compare whole-frame drop_duplicates with chunked removal remembering row hashes
+    in a Python set, in the compact digest set, and partitioned on disk."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"{'rows':>10} {'dedupe':>16} {'dropped':>9} {'seconds':>9} {'peak RSS MB':>12}")
+    for rows in row_counts:
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "input.csv")
+            make_csv(source, rows)
+            for mode in ["drop_duplicates", "python set", "digest set", "spilled"]:
+                output = subprocess.run(
+                    [sys.executable, "-c", DEDUPE_SCRIPT, source, os.path.join(directory, "output.csv"), mode],
+                    cwd=here, capture_output=True, text=True, check=True,
+                ).stdout
+                dropped, seconds, max_rss_kb = output.split()
+                print(f"{rows:>10} {mode:>16} {int(dropped):>9} {float(seconds):>9.2f} {int(max_rss_kb) / 1024:>12.1f}")
+
+
+def check_dedupe(rows=30_000, chunksize=777):
+    """Check that chunked duplicate removal (in-memory digests and spilled to disk)
+    keeps exactly the rows ``drop_duplicates`` keeps, on data that trips up hashing:
+    ids above 2**53, columns parsed as ints in one chunk and floats in another, and
+    gaps."""
+    from sweeper import stream_clean_file
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "id": rng.integers(2 ** 53, 2 ** 53 + 200, rows),
+        "amount": rng.choice([1.0, 2.5, 3.0, np.nan], rows),
+        "count": np.where(np.arange(rows) < rows // 2, 1, rng.choice([1.0, np.nan], rows)),
+        "city": rng.choice(["Karachi", "Lahore", None], rows),
+        "flag": rng.choice([True, False], rows),
+    })
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "input.csv")
+        df.to_csv(source, index=False)
+        expected = pd.read_csv(source).drop_duplicates().reset_index(drop=True)
+        for spill_partitions in [0, 8]:
+            destination = os.path.join(directory, "output.csv")
+            written, dropped = stream_clean_file(source, destination, remove_duplicates=True,
+                                                 chunksize=chunksize, spill_partitions=spill_partitions)
+            pd.testing.assert_frame_equal(pd.read_csv(destination), expected)
+            assert (written, dropped) == (len(expected), rows - len(expected))
+            mode = "spilled" if spill_partitions else "digest set"
+            print(f"{mode:>12}: kept {written} of {rows} rows, same as drop_duplicates")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Data Sweeper benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    stream_parser = subparsers.add_parser("stream", help="whole-frame vs chunked CSV cleaning")
+    stream_parser.add_argument("--rows", type=int, nargs="+", default=[1000000])
+    stream_parser.add_argument("--chunksize", type=int, default=100_000)
+
+    load_parser = subparsers.add_parser("load", help="default vs column-projected, compact-dtype parsing")
+    load_parser.add_argument("--rows", type=int, default=1000000)
+
+    parallel_parser = subparsers.add_parser("parallel", help="one-by-one vs process-pool multi-file processing")
+    parallel_parser.add_argument("--files", type=int, default=4)
+    parallel_parser.add_argument("--rows", type=int, default=250000)
+
+    formats_parser = subparsers.add_parser("formats", help="write/read time and size of each output format")
+    formats_parser.add_argument("--rows", type=int, default=200000)
+
+    chart_parser = subparsers.add_parser("chart", help="chart downsampling time per method")
+    chart_parser.add_argument("--rows", type=int, nargs="+", default=[1000000, 10000000])
+    chart_parser.add_argument("--max-points", type=int, default=1000)
+
+    profile_parser = subparsers.add_parser("profile", help="exact vs one-pass sketch profiling")
+    profile_parser.add_argument("--rows", type=int, nargs="+", default=[1000000])
+
+    excel_parser = subparsers.add_parser("excel", help="pd.read_excel vs streaming XLSX reading")
+    excel_parser.add_argument("--rows", type=int, nargs="+", default=[100000])
+
+    dedupe_parser = subparsers.add_parser("dedupe", help="in-memory vs hash-set vs on-disk duplicate removal")
+    dedupe_parser.add_argument("--rows", type=int, nargs="+", default=[1000000])
+
+    subparsers.add_parser("dedupe-check", help="chunked duplicate removal agrees with drop_duplicates")
+
+    args = parser.parse_args()
+    if args.benchmark == "stream":
+        bench_stream(args.rows, args.chunksize)
+    elif args.benchmark == "load":
+        bench_load(args.rows)
+    elif args.benchmark == "parallel":
+        bench_parallel(args.files, args.rows)
+    elif args.benchmark == "formats":
+        bench_formats(args.rows)
+    elif args.benchmark == "chart":
+        bench_chart(args.rows, args.max_points)
+    elif args.benchmark == "profile":
+        bench_profile(args.rows)
+    elif args.benchmark == "excel":
+        bench_excel(args.rows)
+    elif args.benchmark == "dedupe":
+        bench_dedupe(args.rows)
+    elif args.benchmark == "dedupe-check":
+        check_dedupe()
+
+
+if __name__ == "__main__":
+    main()
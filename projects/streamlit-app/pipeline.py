@@ -0,0 +1,274 @@
+"""Cleaning pipelines for Data Sweeper, and the command line for running them headless.
+
+A pipeline is the columns to keep plus the cleaning steps chosen for a file, in the
+order they were chosen. It is applied lazily, only when a cleaned frame is needed,
+and can be exported as JSON from the app and replayed over batches of files:
+
+    python pipeline.py "data/*.csv" --output-dir reports/ --pipeline cleaning.json --to Parquet
+    python pipeline.py "data/**/*.xlsx" --remove-duplicates --fill-missing --columns id amount
+    python pipeline.py "logs/*.csv" --chunked --remove-duplicates --spill-partitions 64
+
+Files are processed in parallel worker processes and each file's row counts and
+timing are printed as it finishes. With ``--chunked``, CSV and Excel files are cleaned
+chunk by chunk instead of being loaded whole, for files larger than memory.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from sweeper import (COMPRESSIONS, INPUT_EXTENSIONS, OUTPUT_FORMATS, convert_frame, read_columns, read_sample,
+                     stream_clean_file)
+
+# Inputs and outputs that can be cleaned chunk by chunk (see ``stream_clean_file``)
+CHUNKED_EXTENSIONS = (".csv", ".xlsx")
+CHUNKED_FORMATS = ("CSV", "Excel")
+
+STEP_LABELS = {
+    "remove_duplicates": "Remove duplicates",
+    "fill_missing": "Fill missing values",
+}
+
+
+def apply_steps(df, steps):
+    """Apply cleaning steps to a frame, in order, in one fused pass.
+
+    Duplicate removal only records a row mask and mean filling only records the
+    means (over the rows kept so far), so the frame is copied once at the end
+    rather than once per step. Duplicates found after a fill are judged on the
+    filled values, as they would be when running the steps one by one."""
+    keep = None
+    means = None
+    for step in dict.fromkeys(steps):
+        if step == "remove_duplicates":
+            if means:
+                df = df.fillna(means)
+                means = None
+            keep = ~df.duplicated()
+        elif step == "fill_missing":
+            numeric_cols = df.select_dtypes(include=['number']).columns
+            values = df[numeric_cols] if keep is None else df.loc[keep, numeric_cols]
+            means = values.mean().dropna().to_dict()
+        else:
+            raise ValueError(f"Unknown cleaning step: {step}")
+    if keep is not None:
+        df = df[keep]
+    if means:
+        df = df.fillna(means)
+    return df
+
+
+class Pipeline:
+    """The columns to keep (all of them if None) and the cleaning steps for a file."""
+
+    def __init__(self, columns=None, steps=()):
+        self.columns = list(columns) if columns is not None else None
+        self.steps = []
+        for step in steps:
+            self.add_step(step)
+
+    def add_step(self, step):
+        """Record a cleaning step. A step already in the pipeline is not added twice,
+        since running it again would change nothing."""
+        if step not in STEP_LABELS:
+            raise ValueError(f"Unknown cleaning step: {step}")
+        if step not in self.steps:
+            self.steps.append(step)
+
+    def describe(self):
+        """The steps as a readable list, e.g. ``"Remove duplicates → Fill missing values"``."""
+        return " → ".join(STEP_LABELS[step] for step in self.steps)
+
+    def to_dict(self):
+        return {"columns": self.columns, "steps": list(self.steps)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("columns"), data.get("steps", ()))
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=4)
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+    def apply(self, df):
+        """Project ``df`` onto the pipeline's columns and apply its steps."""
+        if self.columns is not None:
+            df = df[self.columns]
+        return apply_steps(df, self.steps)
+
+    def apply_cached(self, df, cache, base_key):
+        """Apply the steps to ``df`` (already projected), memoizing the result of every
+        step prefix in ``cache`` under ``(base_key, steps)``.
+
+        The longest prefix already cached is reused and only the remaining steps are
+        applied, fused; adding one step to a cached pipeline costs just that step."""
+        start = 0
+        for length in range(len(self.steps), 0, -1):
+            cached = cache.get((base_key, tuple(self.steps[:length])))
+            if cached is not None:
+                df, start = cached, length
+                break
+        if start == len(self.steps):
+            return df
+        df = apply_steps(df, self.steps[start:])
+        cache.put((base_key, tuple(self.steps)), df)
+        return df
+
+    def load(self, path, sheet=None):
+        """Parse a file, reading only the pipeline's columns (with compact dtypes).
+        ``sheet`` picks an Excel sheet (the first by default)."""
+        file_ext = os.path.splitext(path)[-1].lower()
+        sheet = sheet if file_ext == ".xlsx" else None
+        sample = read_sample(path, file_ext, sheet=sheet)
+        columns = self.columns if self.columns is not None else list(sample.columns)
+        return read_columns(path, file_ext, columns, sample, sheet)
+
+
+def expand_paths(patterns):
+    """The supported files matched by glob patterns and directories, in order and
+    without repeats."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, name) for name in sorted(os.listdir(pattern))]
+        else:
+            matches = sorted(glob.glob(pattern, recursive=True))
+        for path in matches:
+            if (os.path.isfile(path) and os.path.splitext(path)[-1].lower() in INPUT_EXTENSIONS
+                    and path not in paths):
+                paths.append(path)
+    return paths
+
+
+def output_path(path, output_dir, output_format):
+    """Where the converted copy of ``path`` goes."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(output_dir, name + OUTPUT_FORMATS[output_format][0])
+
+
+def clean_file(pipeline, path, destination, output_format="CSV", compression=None, sheet=None,
+               chunked=False, spill_partitions=0):
+    """Parse, clean and convert one file. Returns ``(rows read, rows written, seconds)``.
+
+    With ``chunked``, CSV and Excel files are streamed through ``stream_clean_file``
+    (``spill_partitions`` as there) instead of being loaded whole; other inputs are
+    small enough in their columnar form to load as usual."""
+    start = time.perf_counter()
+    file_ext = os.path.splitext(path)[-1].lower()
+    if chunked and file_ext in CHUNKED_EXTENSIONS:
+        rows_written, dropped = stream_clean_file(
+            path, destination, pipeline.columns, "remove_duplicates" in pipeline.steps,
+            "fill_missing" in pipeline.steps, output_format, file_ext=file_ext,
+            sheet=sheet if file_ext == ".xlsx" else None, spill_partitions=spill_partitions)
+        return rows_written + dropped, rows_written, time.perf_counter() - start
+    df = pipeline.load(path, sheet)
+    rows_read = len(df)
+    df = apply_steps(df, pipeline.steps)
+    with open(destination, "wb") as output:
+        output.write(convert_frame(df, output_format, compression))
+    return rows_read, len(df), time.perf_counter() - start
+
+
+def run_batch(pipeline, paths, output_dir, output_format="CSV", compression=None, workers=None, sheet=None,
+              chunked=False, spill_partitions=0):
+    """Clean and convert ``paths`` into ``output_dir`` using ``workers`` processes
+    (one per CPU by default). Yields ``(path, result, error)`` as each file finishes,
+    where ``result`` is what ``clean_file`` returns and ``error`` the exception, if any."""
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = {path: output_path(path, output_dir, output_format) for path in paths}
+    options = (output_format, compression, sheet, chunked, spill_partitions)
+    if workers == 1:
+        for path, destination in jobs.items():
+            try:
+                yield path, clean_file(pipeline, path, destination, *options), None
+            except Exception as e:
+                yield path, None, e
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(clean_file, pipeline, path, destination, *options): path
+            for path, destination in jobs.items()
+        }
+        for future in as_completed(futures):
+            error = future.exception()
+            yield futures[future], None if error else future.result(), error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean and convert batches of files with Data Sweeper")
+    parser.add_argument("paths", nargs="+", help="files, glob patterns (quote them) or directories")
+    parser.add_argument("--pipeline", help="pipeline JSON exported from the app, instead of the options below")
+    parser.add_argument("--columns", nargs="+", help="columns to keep (default: all)")
+    parser.add_argument("--remove-duplicates", action="store_true", help="remove duplicate rows")
+    parser.add_argument("--fill-missing", action="store_true", help="fill numeric gaps with the column mean")
+    parser.add_argument("--to", choices=list(OUTPUT_FORMATS), default="CSV", help="output format")
+    parser.add_argument("--compression", help="Parquet/Feather compression: " + "; ".join(
+        f"{output_format}: {', '.join(choices)}" for output_format, choices in COMPRESSIONS.items()))
+    parser.add_argument("--output-dir", default="cleaned", help="where to write the converted files")
+    parser.add_argument("--sheet", help="Excel sheet to read (default: the first)")
+    parser.add_argument("--workers", type=int, help="parallel worker processes (default: one per CPU)")
+    parser.add_argument("--chunked", action="store_true",
+                        help="clean CSV and Excel files chunk by chunk instead of loading them whole"
+                             " (output to CSV or Excel)")
+    parser.add_argument("--spill-partitions", type=int, default=0, metavar="N",
+                        help="with --chunked, find duplicates through N hash partitions on disk"
+                             " (for more distinct rows than fit in memory)")
+    args = parser.parse_args()
+
+    if args.pipeline:
+        if args.columns or args.remove_duplicates or args.fill_missing:
+            parser.error("--pipeline can't be combined with --columns, --remove-duplicates or --fill-missing")
+        with open(args.pipeline, encoding="utf-8") as file:
+            pipeline = Pipeline.from_json(file.read())
+    else:
+        steps = [step for step, chosen in [("remove_duplicates", args.remove_duplicates),
+                                           ("fill_missing", args.fill_missing)] if chosen]
+        pipeline = Pipeline(args.columns, steps)
+    if args.compression and args.compression not in COMPRESSIONS.get(args.to, []):
+        parser.error(f"--compression {args.compression} isn't available for {args.to}")
+    if args.chunked:
+        if args.to not in CHUNKED_FORMATS:
+            parser.error(f"--chunked writes {' or '.join(CHUNKED_FORMATS)}, not {args.to}")
+        if pipeline.steps == ["fill_missing", "remove_duplicates"]:
+            parser.error("--chunked removes duplicates before filling missing values;"
+                         " use a pipeline with the steps in that order")
+    if args.spill_partitions < 0:
+        parser.error("--spill-partitions can't be negative")
+    if args.spill_partitions and not args.chunked:
+        parser.error("--spill-partitions needs --chunked")
+
+    paths = expand_paths(args.paths)
+    if not paths:
+        parser.error("no CSV, Excel, Parquet or Feather files matched")
+    destinations = [output_path(path, args.output_dir, args.to) for path in paths]
+    if len(set(destinations)) < len(destinations):
+        parser.error("some files have the same name and would overwrite each other's output")
+
+    start = time.perf_counter()
+    failed = 0
+    total_read = total_written = 0
+    print(f"{'file':<40} {'rows in':>10} {'rows out':>10} {'seconds':>9}")
+    for path, result, error in run_batch(pipeline, paths, args.output_dir, args.to, args.compression, args.workers,
+                                           args.sheet, args.chunked, args.spill_partitions):
+        if error is not None:
+            failed += 1
+            print(f"{path:<40} error: {error}", file=sys.stderr)
+            continue
+        rows_read, rows_written, seconds = result
+        total_read += rows_read
+        total_written += rows_written
+        print(f"{path:<40} {rows_read:>10} {rows_written:>10} {seconds:>9.2f}")
+    print(f"{len(paths) - failed} of {len(paths)} files, {total_read} rows in, {total_written} rows out,"
+          f" {time.perf_counter() - start:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""Approximate dataset profiles for Data Sweeper.
+
+A profile is built in one pass over a file's chunks, keeping only small sketches per
+column, so it costs the same memory however big the file is:
+
+* null counts, minimums and maximums are exact;
+* distinct counts are estimated with HyperLogLog;
+* quantiles come from a mergeable sampling sketch (KLL-style compactors);
+* the most frequent values come from Misra-Gries counters.
+"""
+
+import numpy as np
+import pandas as pd
+
+from sweeper import column_hashes, iter_chunks
+
+
+class HyperLogLog:
+    """Distinct count estimate from ``2**precision`` registers (about
+    ``1.04 / sqrt(2**precision)`` relative error: 0.8% at the default precision)."""
+
+    def __init__(self, precision=14):
+        # Below 11 bits of precision the rest of a hash wouldn't fit a float64 exactly
+        if not 11 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 11 and 18")
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype=np.uint8)
+
+    def update(self, hashes):
+        """Add a batch of 64-bit hashes."""
+        if not len(hashes):
+            return
+        index_bits = np.uint64(64 - self.precision)
+        buckets = (hashes >> index_bits).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.precision)) - 1)
+        # frexp's exponent is the bit length, exact since ``rest`` fits a float64's mantissa
+        bit_lengths = np.frexp(rest.astype(np.float64))[1]
+        ranks = (64 - self.precision - bit_lengths + 1).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(2.0 ** -self.registers.astype(np.float64))
+        empty = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and empty:
+            # Linear counting is more accurate while many registers are still empty
+            estimate = m * np.log(m / empty)
+        return int(round(estimate))
+
+
+class QuantileSketch:
+    """Approximate quantiles of a stream of numbers from a bounded sample.
+
+    Values land in level 0; whenever a level holds more than ``capacity`` items it is
+    sorted and every other item (from a random start) moves up a level with twice the
+    weight. Memory stays at ``capacity`` items per level, and levels grow with the
+    log of the stream length."""
+
+    def __init__(self, capacity=2048, seed=0):
+        self.capacity = capacity
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        """Add a batch of numbers (NaN is ignored)."""
+        values = np.asarray(values, dtype=np.float64)
+        self.levels[0] = np.concatenate([self.levels[0], values[~np.isnan(values)]])
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.capacity:
+                items = np.sort(items)
+                # An odd item out stays behind so no weight is lost
+                leftover = items[-1:] if len(items) % 2 else items[:0]
+                items = items[:len(items) - len(leftover)]
+                promoted = items[self.rng.integers(2)::2]
+                self.levels[level] = leftover
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def quantiles(self, qs):
+        """Approximate values at the quantiles ``qs`` (NaN if the sketch is empty)."""
+        items = np.concatenate(self.levels)
+        if not len(items):
+            return [np.nan] * len(qs)
+        weights = np.concatenate([np.full(len(level), 2.0 ** height) for height, level in enumerate(self.levels)])
+        order = np.argsort(items)
+        items, cumulative = items[order], np.cumsum(weights[order])
+        ranks = np.asarray(qs) * cumulative[-1]
+        return items[np.minimum(np.searchsorted(cumulative, ranks), len(items) - 1)].tolist()
+
+
+class TopValues:
+    """Most frequent values with Misra-Gries counters: at most ``capacity`` values are
+    tracked, and each count is low by at most ``total / (capacity + 1)``."""
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype="int64")
+
+    def update(self, series):
+        chunk_counts = series.value_counts(dropna=True)
+        counts = self.counts.add(chunk_counts[chunk_counts > 0], fill_value=0)
+        if len(counts) > self.capacity:
+            threshold = counts.nlargest(self.capacity + 1).iloc[-1]
+            counts = counts[counts > threshold] - threshold
+        self.counts = counts
+
+    def top(self, k=5):
+        return self.counts.nlargest(k)
+
+
+PROFILE_QUANTILES = [0.25, 0.5, 0.75]
+
+
+class ColumnProfile:
+    """Sketches for one column, updated chunk by chunk."""
+
+    def __init__(self):
+        self.rows = 0
+        self.nulls = 0
+        self.numeric = True
+        self.low = np.inf
+        self.high = -np.inf
+        self.distinct = HyperLogLog()
+        self.quantiles = QuantileSketch()
+        self.top_values = TopValues()
+
+    def update(self, series):
+        self.rows += len(series)
+        self.nulls += int(series.isna().sum())
+        values = series.dropna()
+        self.distinct.update(column_hashes(values))
+        self.top_values.update(values)
+        if self.numeric and pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            numbers = values.to_numpy(dtype=np.float64)
+            self.quantiles.update(numbers)
+            if len(numbers):
+                self.low = min(self.low, numbers.min())
+                self.high = max(self.high, numbers.max())
+        elif len(values):
+            # A column that isn't numeric in every chunk isn't numeric
+            self.numeric = False
+
+    def summary(self):
+        q1, median, q3 = self.quantiles.quantiles(PROFILE_QUANTILES) if self.numeric else [None] * 3
+        low, high = (self.low, self.high) if self.numeric and self.rows > self.nulls else (None, None)
+        top = self.top_values.top()
+        return {
+            "type": "number" if self.numeric and self.rows > self.nulls else "text",
+            "nulls": self.nulls,
+            "null %": round(100 * self.nulls / self.rows, 2) if self.rows else 0.0,
+            "distinct ≈": min(self.distinct.estimate(), self.rows - self.nulls),
+            "min": low,
+            "25% ≈": q1,
+            "median ≈": median,
+            "75% ≈": q3,
+            "max": high,
+            "top values ≈": ", ".join(f"{value} ({int(count)})" for value, count in top.items()),
+        }
+
+
+def profile_file(file, file_ext, chunksize=100_000, sheet=None):
+    """Profile every column of a file in one pass over its chunks: one profile row
+    per column, with the file's row count in ``profile.attrs["rows"]``."""
+    columns = {}
+    rows = 0
+    for chunk in iter_chunks(file, file_ext, chunksize=chunksize, sheet=sheet):
+        rows += len(chunk)
+        for col in chunk.columns:
+            if col not in columns:
+                columns[col] = ColumnProfile()
+            columns[col].update(chunk[col])
+    profile = pd.DataFrame([column.summary() for column in columns.values()], index=list(columns))
+    profile.attrs["rows"] = rows
+    return profile
@@ -0,0 +1,605 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+
+def content_hash(data):
+    """Return a short hex digest identifying file contents."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def frame_size(df):
+    """Approximate memory taken by a DataFrame, in bytes."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+INPUT_EXTENSIONS = (".csv", ".xlsx", ".parquet", ".feather", ".arrow")
+COLUMNAR_EXTENSIONS = (".parquet", ".feather", ".arrow")
+
+
+def read_columnar(file, file_ext, columns=None, nrows=None):
+    """Read a Parquet or Feather/Arrow file (needs pyarrow), only ``columns``, and only
+    the first ``nrows`` rows if given, without decoding the rest of the file."""
+    if nrows is None:
+        if file_ext == ".parquet":
+            return pd.read_parquet(file, columns=columns)
+        return pd.read_feather(file, columns=columns)
+
+    import pyarrow as pa
+
+    if file_ext == ".parquet":
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(file)
+        batch = next(parquet.iter_batches(batch_size=nrows, columns=columns), None)
+        table = pa.Table.from_batches([batch]) if batch is not None else parquet.schema_arrow.empty_table()
+    else:
+        import pyarrow.ipc
+
+        reader = pa.ipc.open_file(file)
+        batches = []
+        rows = 0
+        for index in range(reader.num_record_batches):
+            if rows >= nrows:
+                break
+            batches.append(reader.get_batch(index))
+            rows += batches[-1].num_rows
+        table = pa.Table.from_batches(batches, schema=reader.schema).slice(0, nrows)
+        if columns is not None:
+            table = table.select(list(columns))
+    return table.to_pandas()
+
+
+def sheet_names(file):
+    """Names of the sheets of an Excel workbook, read without loading any cells."""
+    from openpyxl import load_workbook
+
+    if hasattr(file, "seek"):
+        file.seek(0)
+    workbook = load_workbook(file, read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+
+def iter_xlsx_chunks(file, sheet=None, columns=None, dtypes=None, chunksize=100_000, nrows=None):
+    """Read one sheet (the first if None) of an Excel workbook in chunks of ``chunksize``
+    rows, streaming cell values through openpyxl's read-only mode instead of building
+    the whole workbook. Types are inferred per chunk as ``pd.read_excel`` would, and
+    blank rows at the end of the sheet are dropped like it does."""
+    from openpyxl import load_workbook
+    from pandas.io.parsers import TextParser
+
+    if hasattr(file, "seek"):
+        file.seek(0)
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet is not None else workbook.worksheets[0]
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            # An empty sheet, which pd.read_excel reads as an empty frame
+            yield pd.DataFrame()
+            return
+        header = [f"Unnamed: {index}" if name is None else name for index, name in enumerate(header)]
+        width = len(header)
+
+        def parse(batch):
+            parser = TextParser([header] + batch, header=0, usecols=columns, dtype=dtypes)
+            return parser.read()
+
+        batch = []
+        blank_rows = 0
+        rows_read = 0
+        for row in rows:
+            if nrows is not None and rows_read >= nrows:
+                break
+            rows_read += 1
+            if all(value is None for value in row):
+                # Held back until a later row shows they aren't trailing
+                blank_rows += 1
+                continue
+            if len(row) != width:
+                row = row[:width] + (None,) * (width - len(row))
+            batch.extend([None] * width for _ in range(blank_rows))
+            batch.append(list(row))
+            blank_rows = 0
+            if len(batch) >= chunksize:
+                yield parse(batch)
+                batch = []
+        if batch or rows_read == blank_rows:
+            yield parse(batch)
+    finally:
+        workbook.close()
+
+
+def read_file(file, file_ext, columns=None, dtypes=None, nrows=None, sheet=None):
+    """Parse an uploaded CSV, Excel, Parquet or Feather file into a DataFrame.
+
+    Only ``columns`` (all of them if None) are parsed, in the order given, and
+    ``dtypes`` maps columns to the dtype to parse them as. ``sheet`` picks the sheet
+    of an Excel workbook (the first if None)."""
+    if hasattr(file, "seek"):
+        file.seek(0)
+    if dtypes and columns is not None:
+        dtypes = {col: dtype for col, dtype in dtypes.items() if col in columns}
+    if file_ext == ".csv":
+        df = pd.read_csv(file, usecols=columns, dtype=dtypes, nrows=nrows)
+    elif file_ext == ".xlsx":
+        df = pd.concat(iter_xlsx_chunks(file, sheet, columns, dtypes, nrows=nrows), ignore_index=True)
+    elif file_ext in COLUMNAR_EXTENSIONS:
+        df = read_columnar(file, file_ext, columns, nrows)
+        if dtypes:
+            df = df.astype(dtypes)
+    else:
+        raise ValueError(f"Unsupported file type: {file_ext}")
+    if columns is not None:
+        df = df[list(columns)]
+    return df
+
+
+def read_sample(file, file_ext, sample_rows=10_000, sheet=None):
+    """Parse the first ``sample_rows`` rows of a file, to learn its columns and dtypes."""
+    return read_file(file, file_ext, nrows=sample_rows, sheet=sheet)
+
+
+def category_columns(sample, max_ratio=0.5):
+    """Text columns of a sample with few distinct values for their length, which
+    are cheaper to hold as categoricals: ``{column: "category"}``."""
+    dtypes = {}
+    for col in sample.select_dtypes(include=['object', 'string']).columns:
+        values = sample[col].dropna()
+        if len(values) and values.nunique() <= max_ratio * len(values):
+            dtypes[col] = "category"
+    return dtypes
+
+
+def downcast_integers(df):
+    """Store integer columns in the smallest integer type that holds their values.
+    Floats are left alone, since float32 would change the values written back out."""
+    for col in df.select_dtypes(include=['integer']).columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
+
+
+def read_columns(file, file_ext, columns, sample, sheet=None):
+    """Parse only ``columns`` of a file, with the compact dtypes suggested by ``sample``:
+    low-cardinality text as categoricals and integers downcast."""
+    return downcast_integers(read_file(file, file_ext, columns, category_columns(sample), sheet=sheet))
+
+
+OUTPUT_FORMATS = {
+    "CSV": (".csv", "text/csv"),
+    "Excel": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+    "Feather": (".feather", "application/vnd.apache.arrow.file"),
+}
+
+# Compression codecs offered for the columnar formats, default first
+COMPRESSIONS = {
+    "Parquet": ["snappy", "zstd", "gzip", "none"],
+    "Feather": ["lz4", "zstd", "uncompressed"],
+}
+
+
+def parse_upload(data, file_ext, columns=None, sample=None, sheet=None):
+    """Parse the bytes of an upload: its sample (unless already known) and then the
+    ``columns`` to keep (all of them if None). Returns ``(sample, df)``.
+
+    Takes and returns plain picklable values so it can run in a worker process."""
+    file = BytesIO(data)
+    if sample is None:
+        sample = read_sample(file, file_ext, sheet=sheet)
+    if columns is None:
+        columns = list(sample.columns)
+    return sample, read_columns(file, file_ext, columns, sample, sheet)
+
+
+def convert_frame(df, output_format, compression=None):
+    """Serialize a DataFrame as CSV, Excel, Parquet or Feather and return the file
+    contents as bytes. ``compression`` applies to Parquet and Feather; it defaults to
+    the first choice in ``COMPRESSIONS``."""
+    buffer = BytesIO()
+    if output_format in COMPRESSIONS and compression is None:
+        compression = COMPRESSIONS[output_format][0]
+    if output_format == "CSV":
+        df.to_csv(buffer, index=False)
+    elif output_format == "Excel":
+        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+            df.to_excel(writer, index=False)
+    elif output_format == "Parquet":
+        df.to_parquet(buffer, index=False, compression=compression)
+    elif output_format == "Feather":
+        # Feather can't store an index, and cleaning can leave gaps in it
+        df.reset_index(drop=True).to_feather(buffer, compression=compression)
+    else:
+        raise ValueError(f"Unsupported output format: {output_format}")
+    return buffer.getvalue()
+
+
+class FrameCache:
+    """Parsed DataFrames keyed by file content hash, bounded by total memory.
+
+    When adding a frame would exceed ``max_bytes``, the least recently used frames
+    are evicted first. A frame larger than the whole budget is simply not kept.
+    Safe to share between Streamlit sessions (threads).
+
+    Other values can be cached by passing the function that measures them as
+    ``size``, e.g. ``len`` for serialized files."""
+
+    def __init__(self, max_bytes, size=frame_size):
+        self.max_bytes = max_bytes
+        self.size = size
+        self.total_bytes = 0
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached frame for ``key`` (marking it recently used), or None."""
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is None:
+                return None
+            self._frames.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, df):
+        """Cache a frame, evicting least recently used frames to stay within budget."""
+        size = self.size(df)
+        with self._lock:
+            if key in self._frames:
+                self.total_bytes -= self._frames.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            while self._frames and self.total_bytes + size > self.max_bytes:
+                _, (_, evicted_size) = self._frames.popitem(last=False)
+                self.total_bytes -= evicted_size
+            self._frames[key] = (df, size)
+            self.total_bytes += size
+
+    def get_or_parse(self, key, parse):
+        """Return the cached frame for ``key``, calling ``parse()`` and caching it on a miss."""
+        df = self.get(key)
+        if df is None:
+            df = parse()
+            self.put(key, df)
+        return df
+
+
+def default_cache_bytes(variable="DATA_SWEEPER_CACHE_MB", default_mb=1024):
+    """Memory budget for a cache: the environment ``variable`` in MB, or ``default_mb``.
+    Parsed uploads use ``DATA_SWEEPER_CACHE_MB`` (1 GB by default)."""
+    return int(os.environ.get(variable, str(default_mb))) * 1024 * 1024
+
+
+DEFAULT_MAX_POINTS = 1000
+
+# Chart downsampling methods, as shown in the app
+DOWNSAMPLING = {"LTTB": "lttb", "Bin means": "bins"}
+
+
+def lttb_indices(x, y, max_points):
+    """Positions of the points Largest-Triangle-Three-Buckets keeps to draw the line
+    ``(x, y)`` with at most ``max_points`` points.
+
+    The first and last points are kept; the others are split into equal buckets and
+    each bucket keeps the point forming the largest triangle with the point kept
+    before it and the average of the next bucket, which preserves peaks and dips."""
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    max_points = max(max_points, 3)
+    edges = np.append(np.linspace(1, n - 1, max_points - 1).astype(int), n)
+    kept = np.empty(max_points, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2]
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(area.argmax())
+        kept[bucket + 1] = previous
+    return kept
+
+
+def downsample(df, max_points=DEFAULT_MAX_POINTS, method="lttb"):
+    """Reduce the numeric columns of a frame to at most ``max_points`` points each, so a
+    chart of it costs the same however many rows there are. Frames that are already
+    small enough are returned as they are.
+
+    ``"lttb"`` keeps the most visually significant rows of each column (gaps ignored);
+    ``"bins"`` splits the rows into ``max_points`` bins and plots each bin's mean,
+    labelled with its first row."""
+    if len(df) <= max_points:
+        return df
+    values = df.to_numpy(dtype="float64", na_value=np.nan)
+    if method == "bins":
+        starts = np.linspace(0, len(df), max_points + 1).astype(int)[:-1]
+        present = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(present, values, 0.0), starts, axis=0)
+        counts = np.add.reduceat(present, starts, axis=0)
+        with np.errstate(invalid="ignore"):
+            means = sums / counts
+        return pd.DataFrame(means, index=df.index[starts], columns=df.columns)
+    if method == "lttb":
+        series = []
+        for position, col in enumerate(df.columns):
+            rows = np.flatnonzero(~np.isnan(values[:, position]))
+            kept = rows[lttb_indices(rows.astype("float64"), values[rows, position], max_points)]
+            series.append(pd.Series(values[kept, position], index=df.index[kept], name=col))
+        return pd.concat(series, axis=1).sort_index()
+    raise ValueError(f"Unknown downsampling method: {method}")
+
+
+def column_hashes(series):
+    """64-bit hash of every value of a column, stable across chunks.
+
+    A number hashes the same whether its chunk parsed the column as ints or
+    (because of a gap) as floats: whole floats and missing values are hashed as
+    nullable integers, and only fractional floats as floats. Integers are never
+    rounded through float64, so distinct ids above 2**53 keep distinct hashes."""
+    def hashes(values):
+        return pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy()
+
+    if pd.api.types.is_bool_dtype(series):
+        series = series.astype("Int64")
+    if not pd.api.types.is_float_dtype(series):
+        return hashes(series.array)
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    missing = np.isnan(values)
+    whole = missing | ((values == np.floor(values)) & (np.abs(values) < 2.0 ** 63))
+    result = hashes(values)
+    if whole.any():
+        integers = pd.arrays.IntegerArray(np.where(whole & ~missing, values, 0).astype(np.int64), missing)
+        result = np.where(whole, hashes(integers), result)
+    return result
+
+
+def row_hashes(chunk):
+    """64-bit hash of every row of a chunk, stable across chunks (see ``column_hashes``)."""
+    combined = np.zeros(len(chunk), dtype=np.uint64)
+    for position in range(chunk.shape[1]):
+        combined = (combined * np.uint64(0x100000001B3)) ^ column_hashes(chunk.iloc[:, position])
+    return combined
+
+
+class DigestSet:
+    """A set of 64-bit digests stored as sorted uint64 runs: 8 bytes per digest, where
+    a Python set of ints takes about 70.
+
+    Each batch of new digests becomes a run, and runs are merged while the newest is at
+    least as long as the one before it, so there are only O(log n) runs to search."""
+
+    def __init__(self):
+        self.runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    @property
+    def nbytes(self):
+        return sum(run.nbytes for run in self.runs)
+
+    def contains(self, digests):
+        """Boolean array: which of ``digests`` are in the set."""
+        found = np.zeros(len(digests), dtype=bool)
+        for run in self.runs:
+            positions = np.minimum(np.searchsorted(run, digests), len(run) - 1)
+            found |= run[positions] == digests
+        return found
+
+    def add(self, digests):
+        """Add digests that aren't in the set yet."""
+        if not len(digests):
+            return
+        self.runs.append(np.unique(digests))
+        while len(self.runs) > 1 and len(self.runs[-2]) <= len(self.runs[-1]):
+            merged = np.concatenate([self.runs.pop(), self.runs.pop()])
+            merged.sort()
+            self.runs.append(merged)
+
+
+class DuplicateFilter:
+    """Drops rows already seen in earlier chunks (or earlier in the same chunk),
+    remembering only a 64-bit hash per distinct row. ``dropped`` counts the rows
+    dropped so far."""
+
+    def __init__(self):
+        self.seen = DigestSet()
+        self.dropped = 0
+
+    def __call__(self, chunk):
+        hashes = row_hashes(chunk)
+        keep = ~pd.Index(hashes).duplicated() & ~self.seen.contains(hashes)
+        self.seen.add(hashes[keep])
+        self.dropped += len(chunk) - int(keep.sum())
+        return chunk[keep]
+
+
+DIGEST_RECORD = np.dtype([("digest", "<u8"), ("row", "<i8")])
+
+
+def partition_duplicates(source, columns=None, chunksize=100_000, file_ext=".csv", sheet=None,
+                         partitions=16, directory=None):
+    """Find the duplicate rows of a file without holding every row hash in memory.
+
+    A first pass spreads each row's hash and row number over ``partitions`` files on
+    disk (in a temporary directory under ``directory``); each partition is then
+    sorted on its own, so only about ``16 * rows / partitions`` bytes are in memory at
+    once. Returns a bit per row (``np.packbits`` order) set for the rows that repeat
+    an earlier one; see ``KeptRows``."""
+    with tempfile.TemporaryDirectory(prefix="sweeper-dedupe-", dir=directory) as spill:
+        paths = [os.path.join(spill, f"digests-{index}.bin") for index in range(partitions)]
+        outputs = [open(path, "wb") for path in paths]
+        rows = 0
+        try:
+            for chunk in iter_cleaned_chunks(source, columns, None, chunksize, file_ext, sheet):
+                records = np.empty(len(chunk), dtype=DIGEST_RECORD)
+                records["digest"] = row_hashes(chunk)
+                records["row"] = np.arange(rows, rows + len(chunk))
+                rows += len(chunk)
+                owners = records["digest"] % np.uint64(partitions)
+                records = records[np.argsort(owners, kind="stable")]
+                bounds = np.cumsum(np.bincount(owners.astype(np.intp), minlength=partitions))
+                for output, part in zip(outputs, np.split(records, bounds[:-1])):
+                    part.tofile(output)
+        finally:
+            for output in outputs:
+                output.close()
+
+        duplicates = np.zeros((rows + 7) // 8, dtype=np.uint8)
+        for path in paths:
+            records = np.fromfile(path, dtype=DIGEST_RECORD)
+            os.remove(path)
+            # Rows were written in file order, so a stable sort keeps each hash's first row first
+            records = records[np.argsort(records["digest"], kind="stable")]
+            repeats = records["row"][1:][records["digest"][1:] == records["digest"][:-1]]
+            np.bitwise_or.at(duplicates, repeats >> 3, (128 >> (repeats & 7)).astype(np.uint8))
+    return duplicates
+
+
+class KeptRows:
+    """Drops the rows flagged by ``partition_duplicates``, for chunks read in file order.
+    ``dropped`` counts the rows dropped so far."""
+
+    def __init__(self, duplicates):
+        self.duplicates = duplicates
+        self.offset = 0
+        self.dropped = 0
+
+    def __call__(self, chunk):
+        start, stop = self.offset, self.offset + len(chunk)
+        bits = np.unpackbits(self.duplicates[start // 8:(stop + 7) // 8])
+        keep = bits[start % 8:start % 8 + len(chunk)] == 0
+        self.offset = stop
+        self.dropped += len(chunk) - int(keep.sum())
+        return chunk[keep]
+
+
+def iter_chunks(file, file_ext, columns=None, chunksize=100_000, sheet=None):
+    """Read any supported file (path or file object) in chunks of about ``chunksize``
+    rows, keeping only ``columns``."""
+    if hasattr(file, "seek"):
+        file.seek(0)
+    if file_ext == ".csv":
+        yield from pd.read_csv(file, usecols=columns, chunksize=chunksize)
+    elif file_ext == ".xlsx":
+        yield from iter_xlsx_chunks(file, sheet, columns, chunksize=chunksize)
+    elif file_ext == ".parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(file).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    elif file_ext in COLUMNAR_EXTENSIONS:
+        import pyarrow as pa
+        import pyarrow.ipc
+
+        reader = pa.ipc.open_file(file)
+        for index in range(reader.num_record_batches):
+            batch = reader.get_batch(index)
+            yield (batch if columns is None else batch.select(list(columns))).to_pandas()
+    else:
+        raise ValueError(f"Unsupported file type: {file_ext}")
+
+
+def iter_cleaned_chunks(source, columns=None, drop_duplicates=None, chunksize=100_000,
+                        file_ext=".csv", sheet=None):
+    """Yield chunks of ``columns``, passed through ``drop_duplicates`` (a fresh
+    ``DuplicateFilter`` or ``KeptRows``) if given.
+
+    As in the in-memory path, columns are projected first, so duplicates are judged on
+    the kept columns and the projection is pushed into the reader."""
+    for chunk in iter_chunks(source, file_ext, columns, chunksize, sheet):
+        if columns is not None:
+            chunk = chunk[columns]
+        if drop_duplicates is not None:
+            chunk = drop_duplicates(chunk)
+        yield chunk
+
+
+def numeric_means(source, columns=None, drop_duplicates=None, chunksize=100_000,
+                  file_ext=".csv", sheet=None):
+    """First pass of the streaming pipeline: the mean of every numeric column,
+    accumulated chunk by chunk as running sums and counts.
+
+    Only columns that parse as numbers in every chunk are treated as numeric, which is
+    what a whole-frame read would infer."""
+    sums = {}
+    counts = {}
+    numeric_cols = None
+    for chunk in iter_cleaned_chunks(source, columns, drop_duplicates, chunksize, file_ext, sheet):
+        chunk_numeric = set(chunk.select_dtypes(include=['number']).columns)
+        numeric_cols = chunk_numeric if numeric_cols is None else numeric_cols & chunk_numeric
+        for col in chunk_numeric:
+            sums[col] = sums.get(col, 0.0) + chunk[col].sum()
+            counts[col] = counts.get(col, 0) + chunk[col].count()
+    return {
+        col: sums[col] / counts[col]
+        for col in (numeric_cols or ())
+        if counts[col]
+    }
+
+
+def stream_clean_file(source, destination, columns=None, remove_duplicates=False,
+                      fill_missing=False, output_format="CSV", chunksize=100_000,
+                      file_ext=".csv", sheet=None, spill_partitions=0):
+    """Clean and convert a file chunk by chunk, never holding the whole file in memory.
+
+    Applies the same steps as the in-memory path, in the same order: column projection,
+    duplicate removal and filling numeric gaps with the column mean (computed in a
+    first pass when requested). Duplicates are found from a compact set of row hashes
+    or, with ``spill_partitions``, from hashes partitioned on disk in a first pass
+    (for more distinct rows than their hashes fit in memory). Output
+    is written incrementally to ``destination`` (path or binary file object) as CSV or
+    as an Excel sheet through openpyxl's write-only mode. Returns the number of rows
+    written and the number of duplicates dropped."""
+    duplicates = None
+    if remove_duplicates and spill_partitions:
+        duplicates = partition_duplicates(source, columns, chunksize, file_ext, sheet, spill_partitions)
+
+    def duplicate_filter():
+        if duplicates is not None:
+            return KeptRows(duplicates)
+        return DuplicateFilter() if remove_duplicates else None
+
+    if fill_missing:
+        means = numeric_means(source, columns, duplicate_filter(), chunksize, file_ext, sheet)
+    else:
+        means = {}
+
+    if output_format == "Excel":
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet()
+    rows_written = 0
+    header_written = False
+    drop_duplicates = duplicate_filter()
+    for chunk in iter_cleaned_chunks(source, columns, drop_duplicates, chunksize, file_ext, sheet):
+        if means:
+            chunk = chunk.fillna({col: mean for col, mean in means.items() if col in chunk})
+
+        if output_format == "Excel":
+            if not header_written:
+                worksheet.append(list(chunk.columns))
+            for row in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False):
+                worksheet.append(list(row))
+        else:
+            chunk.to_csv(destination, index=False, header=not header_written,
+                         mode="a" if header_written else "w")
+        header_written = True
+        rows_written += len(chunk)
+
+    if output_format == "Excel":
+        workbook.save(destination)
+    return rows_written, drop_duplicates.dropped if drop_duplicates is not None else 0
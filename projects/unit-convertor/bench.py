@@ -0,0 +1,78 @@
+"""Benchmarks for the Multi-Unit Converter.
+
+Run from this directory, e.g.:
+
+    python bench.py batch --sizes 1000 100000 1000000
+    python bench.py categories --size 1000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from converter import convert_value, convert_values
+
+
+def bench_batch(sizes, category="Length", from_unit="Mile", to_unit="Kilometer"):
+    """Compare calling convert_value for every value with one convert_values call."""
+    rng = np.random.default_rng(0)
+    print(f"{'values':>10} {'path':>16} {'seconds':>9} {'values/s':>14}")
+    for size in sizes:
+        values = rng.normal(100, 15, size)
+        as_list = values.tolist()
+        for path in ["convert_value", "convert_values"]:
+            start = time.perf_counter()
+            if path == "convert_value":
+                converted = [convert_value(value, from_unit, to_unit, category) for value in as_list]
+            else:
+                converted = convert_values(values, from_unit, to_unit, category)
+            elapsed = time.perf_counter() - start
+            assert len(converted) == size
+            print(f"{size:>10} {path:>16} {elapsed:>9.4f} {size / elapsed:>14,.0f}")
+
+
+PAIRS = [
+    ("Length", "Mile", "Kilometer"),
+    ("Temperature", "Celsius", "Fahrenheit"),
+    ("Fuel Economy", "Miles per Gallon (US)", "Liters per 100 Kilometers"),
+]
+
+
+def bench_categories(size):
+    """Compare linear, affine and reciprocal conversions, one value at a time and
+    batched."""
+    values = np.random.default_rng(0).uniform(1, 100, size)
+    as_list = values.tolist()
+    print(f"{'category':>14} {'path':>16} {'seconds':>9} {'values/s':>14}")
+    for category, from_unit, to_unit in PAIRS:
+        for path in ["convert_value", "convert_values"]:
+            start = time.perf_counter()
+            if path == "convert_value":
+                converted = [convert_value(value, from_unit, to_unit, category) for value in as_list]
+            else:
+                converted = convert_values(values, from_unit, to_unit, category)
+            elapsed = time.perf_counter() - start
+            assert len(converted) == size
+            print(f"{category:>14} {path:>16} {elapsed:>9.4f} {size / elapsed:>14,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-Unit Converter benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    batch_parser = subparsers.add_parser("batch", help="per-value loop vs vectorized batch conversion")
+    batch_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+
+    categories_parser = subparsers.add_parser("categories", help="linear vs affine vs reciprocal conversions")
+    categories_parser.add_argument("--size", type=int, default=1000000)
+
+    args = parser.parse_args()
+    if args.benchmark == "batch":
+        bench_batch(args.sizes)
+    elif args.benchmark == "categories":
+        bench_categories(args.size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""Conversions for the Multi-Unit Converter, one value at a time or in batches.
+
+Whole columns of readings convert in one vectorized operation, from Python or from
+the command line:
+
+    python converter.py readings.csv --column distance --category Length --from Mile --to Kilometer
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+DATA_FILE = "conversion_data.json"
+
+# Define a fallback default conversion data. A number is the unit's size in the
+# category's base unit; {"factor": f, "offset": o} is an affine unit (base = value * f + o)
+# and {"factor": f, "reciprocal": true} a reciprocal one (base = f / value).
+default_conversion_data = {
+    "Length": {
+        "Meter": 1,
+        "Kilometer": 1000,
+        "Centimeter": 0.01,
+        "Millimeter": 0.001,
+        "Mile": 1609.34,
+        "Yard": 0.9144,
+        "Foot": 0.3048,
+        "Inch": 0.0254
+    },
+    "Mass": {
+        "Kilogram": 1,
+        "Gram": 0.001,
+        "Milligram": 0.000001,
+        "Pound": 0.453592,
+        "Ounce": 0.0283495
+    },
+    "Temperature": {
+        "Kelvin": 1,
+        "Celsius": {"factor": 1, "offset": 273.15},
+        "Fahrenheit": {"factor": 5 / 9, "offset": 459.67 * 5 / 9}
+    },
+    "Fuel Economy": {
+        "Kilometers per Liter": 1,
+        "Miles per Gallon (US)": 0.425144,
+        "Miles per Gallon (UK)": 0.354006,
+        "Liters per 100 Kilometers": {"factor": 100, "reciprocal": True}
+    }
+}
+
+
+def load_conversion_data(path=DATA_FILE):
+    """The JSON conversion table at ``path``, otherwise the default data."""
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return default_conversion_data
+
+
+def parse_unit(spec):
+    """``(factor, offset, reciprocal)`` for a unit's entry in the conversion data."""
+    if not isinstance(spec, dict):
+        return float(spec), 0.0, False
+    factor, offset, reciprocal = float(spec["factor"]), float(spec.get("offset", 0)), bool(spec.get("reciprocal"))
+    if reciprocal and offset:
+        raise ValueError("A reciprocal unit can't have an offset")
+    return factor, offset, reciprocal
+
+
+def affine_formula(scale, shift):
+    """``x × scale + shift`` as text, with ``{x}`` standing for the value."""
+    text = "{x}" if scale == 1 else f"{{x}} × {scale:g}"
+    if shift:
+        text += f" {'+' if shift > 0 else '-'} {abs(shift):g}"
+    return text
+
+
+class Conversion:
+    """A compiled conversion between two units. ``function`` converts a number or a
+    NumPy array, with the pair's constants already folded in; ``formula`` shows it
+    with ``{x}`` for the value; ``factor`` is the constant factor, for linear pairs."""
+
+    def __init__(self, function, formula, factor=None):
+        self.function = function
+        self.formula = formula
+        self.factor = factor
+
+
+def compile_conversion(source, target):
+    """The Conversion between two parsed units (see ``parse_unit``).
+
+    Going through the base unit, every pair folds into one of four shapes:
+    ``x * s``, ``x * s + t``, ``p / x + q`` or ``p / (x * s + t)``."""
+    (a1, b1, reciprocal1), (a2, b2, reciprocal2) = source, target
+    if reciprocal1 and reciprocal2:
+        scale = a2 / a1
+        return Conversion(lambda x: x * scale, affine_formula(scale, 0), scale)
+    if reciprocal1:
+        p, q = a1 / a2, -b2 / a2
+        formula = f"{p:g} ÷ {{x}}" + (f" {'+' if q > 0 else '-'} {abs(q):g}" if q else "")
+        if not q:
+            return Conversion(lambda x: p / x, formula)
+        return Conversion(lambda x: p / x + q, formula)
+    scale, shift = a1 / a2, (b1 - b2) / a2
+    if reciprocal2:
+        # a2 / (a1 * x + b1)
+        if not b1:
+            p = a2 / a1
+            return Conversion(lambda x: p / x, f"{p:g} ÷ {{x}}")
+        return Conversion(lambda x: a2 / (x * a1 + b1), f"{a2:g} ÷ ({affine_formula(a1, b1)})")
+    if not shift:
+        return Conversion(lambda x: x * scale, affine_formula(scale, 0), scale)
+    return Conversion(lambda x: x * scale + shift, affine_formula(scale, shift))
+
+
+class FactorMatrix:
+    """Factors between every pair of a category's units, computed once:
+    ``factors[index[a], index[b]]`` converts a value in unit ``a`` to unit ``b``.
+
+    The table gives each unit's size in the category's base unit (a Kilometer is
+    1000 Meters), so the factor from ``a`` to ``b`` is ``size[a] / size[b]``."""
+
+    def __init__(self, sizes):
+        self.units = list(sizes)
+        self.index = {unit: position for position, unit in enumerate(self.units)}
+        sizes = np.array([sizes[unit] for unit in self.units], dtype=np.float64)
+        self.factors = sizes[:, np.newaxis] / sizes[np.newaxis, :]
+        # The same factors as Python floats: indexing lists is cheaper for one value
+        self.rows = self.factors.tolist()
+
+    def factor(self, from_unit, to_unit):
+        return self.rows[self.index[from_unit]][self.index[to_unit]]
+
+
+class ConversionTable:
+    """The conversion data, with a factor matrix per category whose units are all
+    multiples of the base unit, and compiled conversions for the other categories
+    (built on first use of each pair, then cached)."""
+
+    def __init__(self, data):
+        self.data = data
+        self.parsed = {
+            category: {unit: parse_unit(spec) for unit, spec in units.items()}
+            for category, units in data.items()
+        }
+        self.matrices = {
+            category: FactorMatrix({unit: factor for unit, (factor, offset, reciprocal) in units.items()})
+            for category, units in self.parsed.items()
+            if not any(offset or reciprocal for factor, offset, reciprocal in units.values())
+        }
+        self.conversions = {}
+
+    @property
+    def categories(self):
+        return list(self.parsed)
+
+    def units(self, category):
+        return list(self.parsed[category])
+
+    def conversion(self, from_unit, to_unit, category):
+        """The Conversion from ``from_unit`` to ``to_unit``."""
+        key = (category, from_unit, to_unit)
+        if key not in self.conversions:
+            units = self.parsed.get(category, {})
+            if from_unit not in units or to_unit not in units:
+                raise ValueError(f"Can't convert {from_unit} to {to_unit} in {category}")
+            if category in self.matrices:
+                factor = self.matrices[category].factor(from_unit, to_unit)
+                conversion = Conversion(lambda x: x * factor, affine_formula(factor, 0), factor)
+            else:
+                conversion = compile_conversion(units[from_unit], units[to_unit])
+            self.conversions[key] = conversion
+        return self.conversions[key]
+
+
+_tables = {}
+
+
+def file_stamp(path):
+    """Modification time and size of ``path``, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def conversion_table(path=DATA_FILE):
+    """The ConversionTable for the data file at ``path``, built once and rebuilt
+    whenever the file has changed since."""
+    stamp = file_stamp(path)
+    if path not in _tables or _tables[path][1] != stamp:
+        _tables[path] = (ConversionTable(load_conversion_data(path)), stamp)
+    return _tables[path][0]
+
+
+def convert_value(value, from_unit, to_unit, category):
+    """Convert one value, or return "Conversion not available" for an unknown pair.
+
+    One value at a time is too fine-grained to check the data file on every call, so
+    this uses the table as of the last ``conversion_table()`` call: the app makes one
+    every rerun, but other callers must call ``conversion_table()`` themselves to pick
+    up changes to the data file (``convert_values`` and ``convert_column`` do)."""
+    entry = _tables.get(DATA_FILE)
+    table = entry[0] if entry else conversion_table()
+    matrix = table.matrices.get(category)
+    if matrix is not None:
+        if from_unit in matrix.index and to_unit in matrix.index:
+            return value * matrix.rows[matrix.index[from_unit]][matrix.index[to_unit]]
+        return "Conversion not available"
+    conversion = table.conversions.get((category, from_unit, to_unit))
+    if conversion is None:
+        try:
+            conversion = table.conversion(from_unit, to_unit, category)
+        except ValueError:
+            return "Conversion not available"
+    try:
+        return conversion.function(value)
+    except ZeroDivisionError:
+        return float("inf")
+
+
+def convert_values(values, from_unit, to_unit, category):
+    """Convert a list or NumPy array of values at once. Returns a float64 array
+    (a reciprocal unit's zero converts to infinity)."""
+    function = conversion_table().conversion(from_unit, to_unit, category).function
+    with np.errstate(divide="ignore"):
+        return function(np.asarray(values, dtype=np.float64))
+
+
+def convert_column(source, destination, column, from_unit, to_unit, category,
+                   output_column=None, chunksize=100_000):
+    """Convert one column of a CSV chunk by chunk, writing every column to
+    ``destination`` with the converted values in ``output_column`` (by default the
+    column is replaced). Returns the number of rows converted."""
+    function = conversion_table().conversion(from_unit, to_unit, category).function
+    rows = 0
+    for index, chunk in enumerate(pd.read_csv(source, chunksize=chunksize)):
+        if column not in chunk:
+            raise ValueError(f"No column named {column!r}")
+        with np.errstate(divide="ignore"):
+            chunk[output_column or column] = function(pd.to_numeric(chunk[column]).to_numpy(dtype=np.float64))
+        chunk.to_csv(destination, index=False, header=not index, mode="a" if index else "w")
+        rows += len(chunk)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a column of a CSV file between units")
+    parser.add_argument("source", help="CSV file to read")
+    parser.add_argument("--column", required=True, help="column holding the values")
+    parser.add_argument("--category", required=True, help="unit category, e.g. Length")
+    parser.add_argument("--from", dest="from_unit", required=True, help="unit the values are in")
+    parser.add_argument("--to", dest="to_unit", required=True, help="unit to convert them to")
+    parser.add_argument("--output-column", help="write the converted values to a new column")
+    parser.add_argument("-o", "--output", help="CSV file to write (default: SOURCE_converted.csv)")
+    args = parser.parse_args()
+
+    categories = conversion_table().categories
+    if args.category not in categories:
+        parser.error(f"unknown category {args.category!r}; choose from {', '.join(categories)}")
+    destination = args.output or os.path.splitext(args.source)[0] + "_converted.csv"
+    try:
+        rows = convert_column(args.source, destination, args.column, args.from_unit, args.to_unit,
+                              args.category, args.output_column)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Converted {rows} values from {args.from_unit} to {args.to_unit} into {destination}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,43 +1,14 @@
-import json
+import io
 import os
+import pandas as pd
 import streamlit as st
 
-# Define a fallback default conversion data
-default_conversion_data = {
-    "Length": {
-        "Meter": 1,
-        "Kilometer": 1000,
-        "Centimeter": 0.01,
-        "Millimeter": 0.001,
-        "Mile": 1609.34,
-        "Yard": 0.9144,
-        "Foot": 0.3048,
-        "Inch": 0.0254
-    },
-    "Mass": {
-        "Kilogram": 1,
-        "Gram": 0.001,
-        "Milligram": 0.000001,
-        "Pound": 0.453592,
-        "Ounce": 0.0283495
-    }
-}
-
-# Try to load the JSON file, otherwise use default data
-conversion_data = default_conversion_data
-if os.path.exists("conversion_data.json"):
-    with open("conversion_data.json", "r") as f:
-        conversion_data = json.load(f)
-
-# Conversion function
-def convert_value(value, from_unit, to_unit, category):
-    if from_unit in conversion_data[category] and to_unit in conversion_data[category]:
-        return value * (conversion_data[category][to_unit] / conversion_data[category][from_unit])
-    return "Conversion not available"
+from converter import conversion_table, convert_column, convert_value
 
 # Formula display function
 def get_formula(from_unit, to_unit, category, from_value, to_value):
-    return f"{from_value} {from_unit} × (conversion factor) = {to_value} {to_unit}"
+    formula = conversion_table().conversion(from_unit, to_unit, category).formula
+    return f"{formula.format(x=f'{from_value} {from_unit}')} = {to_value} {to_unit}"
 
 # Detailed explanation function
 def get_conversion_details(from_unit, to_unit, category, from_value, to_value):
@@ -47,11 +18,14 @@ def get_conversion_details(from_unit, to_unit, category, from_value, to_value):
 st.markdown("<h1 class='main-header'>Multi-Unit Converter</h1>", unsafe_allow_html=True)
 st.markdown("<p class='sub-header'>Convert between different units of measurement</p>", unsafe_allow_html=True)
 
+# Conversions for every category, rebuilt when conversion_data.json changes
+table = conversion_table()
+
 col1, col2 = st.columns([1, 3])
 
 with col1:
     st.markdown("### Categories")
-    category = st.selectbox("Select category", list(conversion_data.keys()), label_visibility="collapsed")
+    category = st.selectbox("Select category", table.categories, label_visibility="collapsed")
 
 with col2:
     st.markdown("<div class='category-card'>", unsafe_allow_html=True)
@@ -60,14 +34,14 @@ with col2:
     col_from, col_equal, col_to = st.columns([2, 1, 2])
     
     with col_from:
-        from_unit = st.selectbox("From", list(conversion_data[category].keys()), key="from_unit")
+        from_unit = st.selectbox("From", table.units(category), key="from_unit")
         from_value = st.number_input("Enter value", value=1.0, format="%.8f", key="from_value")
     
     with col_equal:
         st.markdown("<div style='text-align: center; font-size: 2rem; margin-top: 1.7rem;'>=</div>", unsafe_allow_html=True)
     
     with col_to:
-        to_unit = st.selectbox("To", list(conversion_data[category].keys()), key="to_unit")
+        to_unit = st.selectbox("To", table.units(category), key="to_unit")
         to_value = convert_value(from_value, from_unit, to_unit, category)
         
         precision = 2 if category in ["Temperature", "Fuel Economy"] else 4
@@ -84,5 +58,27 @@ with col2:
     
     st.markdown("</div>", unsafe_allow_html=True)
 
+# Batch conversion of a whole CSV column, with the units chosen above
+with st.expander(f"Convert a CSV column from {from_unit} to {to_unit}"):
+    uploaded = st.file_uploader("Upload a CSV file", type=["csv"], key="batch_file")
+    if uploaded is not None:
+        columns = list(pd.read_csv(uploaded, nrows=0).columns)
+        column = st.selectbox("Column to convert", columns, key="batch_column")
+        if st.button("Convert column"):
+            uploaded.seek(0)
+            output = io.StringIO()
+            try:
+                rows = convert_column(uploaded, output, column, from_unit, to_unit, category)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.success(f"Converted {rows} values.")
+                st.download_button(
+                    "Download converted CSV",
+                    data=output.getvalue(),
+                    file_name=os.path.splitext(uploaded.name)[0] + "_converted.csv",
+                    mime="text/csv",
+                )
+
 # Footer
 st.markdown("<div class='footer'>Developed by Syed Bilal Ali Shah | © 2025 Multi-Unit Converter</div>", unsafe_allow_html=True)